@@ -6,8 +6,11 @@ Generate unit and integration tests for Spring Boot applications using AI
 import os
 import sys
 import argparse
-import threading
-import time
+import asyncio
+import io
+import itertools
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add lib to path
@@ -15,10 +18,11 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from lib.ai_client import AIClient
 from lib.java_parser import JavaParser
-from lib.context_gatherer import ContextGatherer
-from lib.prompt_builder import PromptBuilder
+from lib.context_gatherer import ContextGatherer, _scandir_java
+from lib.prompt_builder import PromptBuilder, UNIT_TEST_MARKER, INTEGRATION_TEST_MARKER
 from lib.test_writer import TestWriter
 from lib.dependency_graph import DependencyGraphBuilder
+from lib.diff_patcher import apply_unified_diff, looks_like_diff
 from lib.test_validator import TestValidator
 
 try:
@@ -33,20 +37,84 @@ try:
 except ImportError:
     RICH_AVAILABLE = False
 
+try:
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.completion import WordCompleter
+    PROMPT_TOOLKIT_AVAILABLE = True
+except ImportError:
+    PROMPT_TOOLKIT_AVAILABLE = False
+
+# Input that looks like a class name or .java file is auto-loaded
+_AUTOLOAD_RE = re.compile(r'^[A-Z]\w*(?:Impl|Mapper|Service|Validator|Controller)\b|\.java$')
+
+_HELP_TEXT = """
+## 🤖 AI Test Generator v2.0 Commands
+
+| Command | Description |
+|---------|-------------|
+| `load <name>` | Load class by name (e.g., `load ApiKeyServiceImpl`) |
+| `unit` | Generate unit test for loaded class |
+| `integration` | Generate E2E integration test |
+| `both` | Generate unit + integration tests in one request |
+| `validate` | Compile, run & auto-fix current test |
+| `save` | Save current test to file (both after `both`) |
+| `show` | Show current generated test |
+| `deps` | Show dependency analysis for loaded class |
+| `reset` | Reset chat and start fresh |
+| `clear` | Clear the console screen |
+| `help` | Show this help |
+| `quit` | Exit the chat |
+
+## 🔍 Load Examples:
+- `load OrderService` - finds and loads OrderServiceImpl
+- `load ApiKeyMapper` - loads the exact file
+- `load Project` - shows all matching classes to choose from
+
+## 💬 Chat Mode
+After generating a test, just type your feedback to refine it:
+- "Add more edge cases"
+- "Use different test data"
+- "Add test for error handling"
+"""
+
+# Parsed once at import; rendering the same Markdown object again is cheap
+_HELP_MD = Markdown(_HELP_TEXT) if RICH_AVAILABLE else _HELP_TEXT
+
+# Streamed code is re-highlighted once per this many chunks
+STREAM_RENDER_EVERY = 4
+
+# Maximum number of candidates listed by find_class
+MAX_CLASS_MATCHES = 20
+
 
 class TestGeneratorChat:
     """Interactive chat interface for generating tests"""
     
-    def __init__(self, project_root: str):
+    # Fixed attribute set: fast attribute access, and typos raise instead of adding attributes
+    __slots__ = (
+        'project_root', 'console', 'is_tty', 'use_build_cache',
+        'parser', 'context', 'prompt_builder', 'writer', 'dep_graph', 'validator', 'ai_client',
+        'current_java_class', 'current_test_code', 'current_test_type', 'generated_tests',
+        'related_content', 'required_mocks', 'method_calls',
+        '_java_index', '_index_mtime', '_class_names',
+    )
+    
+    def __init__(self, project_root: str, use_build_cache: bool = False):
         # If running from tools/test-generator, go up to project root
         self.project_root = Path(project_root).resolve()
         if self.project_root.name == "test-generator":
             self.project_root = self.project_root.parent.parent
         
+        self.use_build_cache = use_build_cache
         self.console = Console() if RICH_AVAILABLE else None
+        # Redirected output gets plain text: no syntax highlighting, markdown or live rendering
+        self.is_tty = sys.stdout.isatty()
         
         # Initialize components
-        self.parser = JavaParser(str(self.project_root / "src/main/java"))
+        self.parser = JavaParser(
+            str(self.project_root / "src/main/java"),
+            cache_dir=str(self.project_root / ".test-generator-cache" / "parsed")
+        )
         self.context = ContextGatherer(str(self.project_root))
         self.prompt_builder = PromptBuilder(self.context)
         self.writer = TestWriter(str(self.project_root))
@@ -58,8 +126,15 @@ class TestGeneratorChat:
         self.current_java_class = None
         self.current_test_code = None
         self.current_test_type = None
+        self.generated_tests = {}  # test type -> code from the last generation ('both' makes two), written by save
         self.related_content = {}
         self.required_mocks = {}
+        self.method_calls = None
+        
+        # Class name index for find_class (built lazily, see _get_java_index)
+        self._java_index = None
+        self._index_mtime = None
+        self._class_names = []  # Completion words, rebuilt when the index is
     
     def print(self, message: str, style: str = None):
         """Print message with optional styling"""
@@ -70,7 +145,7 @@ class TestGeneratorChat:
     
     def print_code(self, code: str, language: str = "java"):
         """Print code with syntax highlighting"""
-        if self.console:
+        if self.console and self.is_tty:
             syntax = Syntax(code, language, theme="monokai", line_numbers=True)
             self.console.print(syntax)
         else:
@@ -78,55 +153,95 @@ class TestGeneratorChat:
     
     def print_markdown(self, md: str):
         """Print markdown content"""
-        if self.console:
+        if self.console and self.is_tty:
             self.console.print(Markdown(md))
         else:
             print(md)
     
-    def call_with_spinner(self, func, message: str = "Generating..."):
-        """Execute a function while showing a loading spinner"""
-        import sys
-        result = [None]
-        error = [None]
+    async def _with_spinner(self, func, message: str):
+        """Await a blocking call in the default executor while animating a spinner"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, func)
         
-        def run():
-            try:
-                result[0] = func()
-            except Exception as e:
-                error[0] = e
+        if not self.is_tty:
+            print(message)
+            return await future
         
-        thread = threading.Thread(target=run)
-        thread.start()
+        if self.console:
+            # rich animates the spinner from its own refresh thread
+            with Live(Spinner('dots', text=message), console=self.console,
+                      refresh_per_second=10, transient=True):
+                return await future
         
         spinner_chars = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
         idx = 0
         print()  # New line before spinner
-        while thread.is_alive():
-            sys.stdout.write(f"\r{spinner_chars[idx % len(spinner_chars)]} {message}")
+        try:
+            while True:
+                sys.stdout.write(f"\r{spinner_chars[idx % len(spinner_chars)]} {message}")
+                sys.stdout.flush()
+                try:
+                    # Shield so the timeout only ends the wait, not the call itself
+                    return await asyncio.wait_for(asyncio.shield(future), 0.08)
+                except asyncio.TimeoutError:
+                    idx += 1
+        finally:
+            sys.stdout.write("\r" + " " * (len(message) + 5) + "\r")
             sys.stdout.flush()
-            time.sleep(0.1)
-            idx += 1
-        sys.stdout.write("\r" + " " * (len(message) + 5) + "\r")
-        sys.stdout.flush()
-        print()  # New line after spinner
-        
-        thread.join()
-        
-        if error[0]:
-            raise error[0]
-        
-        return result[0]
+            print()  # New line after spinner
+    
+    def call_with_spinner(self, func, message: str = "Generating..."):
+        """Execute a function while showing a loading spinner"""
+        return asyncio.run(self._with_spinner(func, message))
+    
+    def stream_code(self, prompt: str, message: str, language: str = "java") -> str:
+        """Stream an AI response, rendering the code live as chunks arrive"""
+        stream = self.ai_client.send_message_stream(prompt)
+        if not (self.console and self.is_tty):
+            print(f"\n{message}")
+            return ''.join(stream)
+        
+        buf = io.StringIO()
+        line_count = 0
+        # Keep the tail of the code in view while it grows
+        height = max(self.console.height - 4, 5)
+        with Live(Spinner('dots', text=message), console=self.console,
+                  refresh_per_second=10, transient=True) as live:
+            for i, chunk in enumerate(stream, 1):
+                buf.write(chunk)
+                line_count += chunk.count('\n')
+                if i % STREAM_RENDER_EVERY == 0:
+                    start = max(line_count - height, 0) + 1
+                    live.update(Syntax(buf.getvalue(), language, theme="monokai", line_numbers=True,
+                                       line_range=(start, None)))
+        return buf.getvalue()
     
     def initialize_ai(self):
         """Initialize AI client and validator"""
         try:
             self.print("\n🔄 Initializing AI...", style="cyan")
-            self.ai_client = AIClient(verbose=False)  # Disable verbose during init
-            self.validator = TestValidator(str(self.project_root), self.ai_client)
+            self.ai_client = AIClient(
+                verbose=False,  # Disable verbose during init
+                history_path=str(self.project_root / ".test-generator-cache" / "chat.json")
+            )
+            self.validator = TestValidator(str(self.project_root), self.ai_client,
+                                           use_build_cache=self.use_build_cache)
+            
+            # Analyze the dependency graph in the background, overlapping the system prompt
+            pool = ThreadPoolExecutor(max_workers=1)
+            prewarm = pool.submit(self.dep_graph.prewarm)
+            pool.shutdown(wait=False)
             
             # Send system prompt with loading messages
             system_prompt = self.prompt_builder.build_system_prompt()
             
+            # Warm restart: the previous session already sent this exact system prompt;
+            # the prewarm keeps running while the user types the first command
+            if self.ai_client.resume_session(system_prompt):
+                self.print("♻️  Resumed previous chat session", style="cyan")
+                self.ai_client.verbose = True
+                return True
+            
             def send_system_prompt():
                 return self.ai_client.send_message(system_prompt)
             
@@ -135,6 +250,7 @@ class TestGeneratorChat:
                 send_system_prompt,
                 "📦 Building project context & understanding your code..."
             )
+            prewarm.result()
             
             # Re-enable verbose mode for subsequent calls
             self.ai_client.verbose = True
@@ -144,15 +260,48 @@ class TestGeneratorChat:
             self.print(f"❌ Error initializing AI: {e}", style="red")
             return False
     
+    def _build_java_index(self, src_path: Path):
+        """Index all Java files under src_path by lowercased class name"""
+        self._java_index = {}
+        self._index_mtime = src_path.stat().st_mtime_ns
+        for entry in _scandir_java(str(src_path)):
+            self._java_index.setdefault(entry.name[:-5].lower(), []).append(Path(entry.path))
+        self._class_names = sorted({p.stem for paths in self._java_index.values() for p in paths})
+    
+    def _get_java_index(self) -> dict:
+        """Return the class name index, rebuilding it if the source root changed"""
+        src_path = self.project_root / "src" / "main" / "java"
+        if not src_path.exists():
+            return {}
+        
+        if self._java_index is None or src_path.stat().st_mtime_ns != self._index_mtime:
+            self._build_java_index(src_path)
+        return self._java_index
+    
+    def get_class_names(self) -> list:
+        """Return all class names in the project, for tab completion"""
+        self._get_java_index()
+        return self._class_names
+    
+    def _make_prompt(self, command_names):
+        """Return a function reading one line of input, with class name completion on a terminal"""
+        if not (PROMPT_TOOLKIT_AVAILABLE and sys.stdin.isatty()):
+            return input
+        
+        # Words are looked up on each completion so new classes show up without a restart
+        completer = WordCompleter(lambda: sorted(command_names) + self.get_class_names())
+        session = PromptSession(completer=completer, complete_while_typing=False)
+        return lambda message: session.prompt(message)
+    
     def find_class(self, class_name: str) -> Path:
         """Find a Java class by name (fuzzy search)"""
         # Remove .java extension if provided
         class_name = class_name.replace('.java', '').strip()
+        needle = class_name.lower()
         
-        src_path = self.project_root / "src" / "main" / "java"
-        pattern = f"**/*{class_name}*.java"
-        
-        matches = list(src_path.glob(pattern))
+        # Stop after MAX_CLASS_MATCHES + 1 so we know there are more without collecting them all
+        found = (p for name, paths in self._get_java_index().items() if needle in name for p in paths)
+        matches = list(itertools.islice(found, MAX_CLASS_MATCHES + 1))
         
         if not matches:
             self.print(f"❌ No class found matching: {class_name}", style="red")
@@ -163,13 +312,16 @@ class TestGeneratorChat:
             return matches[0]
         
         # Multiple matches - let user choose
-        self.print(f"\n🔍 Found {len(matches)} matches for '{class_name}':", style="cyan")
-        for i, match in enumerate(matches[:20], 1):
+        too_many = len(matches) > MAX_CLASS_MATCHES
+        matches = matches[:MAX_CLASS_MATCHES]
+        count = f"{MAX_CLASS_MATCHES}+" if too_many else str(len(matches))
+        self.print(f"\n🔍 Found {count} matches for '{class_name}':", style="cyan")
+        for i, match in enumerate(matches, 1):
             rel_path = match.relative_to(self.project_root)
             self.print(f"   {i}. {match.name} ({rel_path.parent})")
         
-        if len(matches) > 20:
-            self.print(f"   ... and {len(matches) - 20} more")
+        if too_many:
+            self.print("   ... and more (use a longer name to narrow down)")
         
         try:
             choice = input("\n🧑 Enter number to load (or 'q' to cancel): ").strip()
@@ -218,6 +370,10 @@ class TestGeneratorChat:
                     return False
             
             self.current_java_class = self.parser.parse_file(str(path))
+            # Tests generated for the previous class must not be saved under this one's name
+            self.current_test_code = None
+            self.current_test_type = None
+            self.generated_tests = {}
             related_files = self.parser.find_related_files(self.current_java_class)
             self.related_content = self.context.get_related_files_content(related_files)
             
@@ -259,7 +415,7 @@ class TestGeneratorChat:
             return "No source file loaded. Use 'load <filepath>' first."
         
         # Pass method_calls if available
-        method_calls = getattr(self, 'method_calls', None)
+        method_calls = self.method_calls
         
         prompt = self.prompt_builder.build_unit_test_prompt(
             self.current_java_class, 
@@ -267,13 +423,13 @@ class TestGeneratorChat:
             method_calls
         )
         
-        # Use spinner for loading indication
-        response = self.call_with_spinner(
-            lambda: self.ai_client.send_message(prompt),
+        response = self.stream_code(
+            prompt,
             f"🔄 Generating unit test for {self.current_java_class.name}..."
         )
         self.current_test_code = response
         self.current_test_type = "unit"
+        self.generated_tests = {"unit": response}
         return response
     
     def generate_integration_test(self) -> str:
@@ -286,12 +442,40 @@ class TestGeneratorChat:
             self.related_content
         )
         
-        response = self.call_with_spinner(
-            lambda: self.ai_client.send_message(prompt),
+        response = self.stream_code(
+            prompt,
             f"🔄 Generating integration test for {self.current_java_class.name}..."
         )
         self.current_test_code = response
         self.current_test_type = "integration"
+        self.generated_tests = {"integration": response}
+        return response
+    
+    def generate_both(self) -> str:
+        """Generate unit and integration tests for loaded class in one request"""
+        if not self.current_java_class:
+            return "No source file loaded. Use 'load <filepath>' first."
+        
+        prompt = self.prompt_builder.build_combined_prompt(
+            self.current_java_class,
+            self.related_content,
+            self.method_calls
+        )
+        
+        response = self.stream_code(
+            prompt,
+            f"🔄 Generating unit + integration tests for {self.current_java_class.name}..."
+        )
+        
+        unit, _, integration = response.partition(INTEGRATION_TEST_MARKER)
+        unit = unit.replace(UNIT_TEST_MARKER, "", 1).strip()
+        integration = integration.strip()
+        
+        self.current_test_code = unit
+        self.current_test_type = "unit"
+        self.generated_tests = {"unit": unit}
+        if integration:
+            self.generated_tests["integration"] = integration
         return response
     
     def refine_test(self, feedback: str) -> str:
@@ -304,15 +488,29 @@ class TestGeneratorChat:
             feedback
         )
         
-        response = self.call_with_spinner(
-            lambda: self.ai_client.send_message(prompt),
-            "🔄 Refining test based on feedback..."
+        response = self.stream_code(
+            prompt,
+            "🔄 Refining test based on feedback...",
+            language="diff"
         )
+        
+        # The model answers with a patch; a reply without hunks is taken as the whole class
+        if looks_like_diff(response):
+            patched = apply_unified_diff(self.current_test_code, response)
+            if patched is None:
+                self.print("⚠️  Diff did not apply cleanly, requesting the full test...", style="yellow")
+                patched = self.stream_code(
+                    self.prompt_builder.build_full_test_request(),
+                    "🔄 Regenerating full test..."
+                )
+            response = patched
+        
         self.current_test_code = response
+        self.generated_tests[self.current_test_type] = response
         return response
     
     def save_test(self) -> str:
-        """Save current test to file"""
+        """Save the current test, or both tests when the last generation was 'both'"""
         if not self.current_java_class:
             return "❌ No source file loaded. Use 'load <classname>' first."
         
@@ -325,48 +523,138 @@ class TestGeneratorChat:
             return f"❌ Test code seems too short ({code_length} chars). Generate a test first."
         
         try:
-            is_integration = self.current_test_type == "integration"
-            file_path = self.writer.write_test(
-                self.current_java_class.package,
-                self.current_java_class.name,
-                self.current_test_code,
-                is_integration
+            file_paths = self.writer.write_many(
+                (self.current_java_class.package, self.current_java_class.name, code, test_type == "integration")
+                for test_type, code in self.generated_tests.items()
             )
-            return f"✅ Test saved to:\n{file_path}"
+            return "✅ Test saved to:\n" + "\n".join(file_paths)
         except Exception as e:
             return f"❌ Error saving test: {e}"
     
     def show_help(self):
         """Show available commands"""
-        help_text = """
-## 🤖 AI Test Generator v2.0 Commands
-
-| Command | Description |
-|---------|-------------|
-| `load <name>` | Load class by name (e.g., `load ApiKeyServiceImpl`) |
-| `unit` | Generate unit test for loaded class |
-| `integration` | Generate E2E integration test |
-| `validate` | Compile, run & auto-fix current test |
-| `save` | Save current test to file |
-| `show` | Show current generated test |
-| `deps` | Show dependency analysis for loaded class |
-| `reset` | Reset chat and start fresh |
-| `clear` | Clear the console screen |
-| `help` | Show this help |
-| `quit` | Exit the chat |
-
-## 🔍 Load Examples:
-- `load OrderService` - finds and loads OrderServiceImpl
-- `load ApiKeyMapper` - loads the exact file
-- `load Project` - shows all matching classes to choose from
-
-## 💬 Chat Mode
-After generating a test, just type your feedback to refine it:
-- "Add more edge cases"
-- "Use different test data"
-- "Add test for error handling"
-"""
-        self.print_markdown(help_text)
+        if self.console and self.is_tty:
+            self.console.print(_HELP_MD)
+        else:
+            print(_HELP_TEXT)
+    
+    def _cmd_quit(self, user_input: str) -> bool:
+        """Exit the chat"""
+        self.print("\n👋 Goodbye!", style="blue")
+        return True
+    
+    def _cmd_help(self, user_input: str):
+        """Show available commands"""
+        self.show_help()
+    
+    def _cmd_load(self, user_input: str):
+        """Load a class by name or path"""
+        parts = user_input.split(maxsplit=1)
+        if len(parts) < 2:
+            self.print("Usage: load <filepath>", style="red")
+        else:
+            self.load_source_file(parts[1])
+    
+    def _cmd_unit(self, user_input: str):
+        """Generate and print a unit test"""
+        response = self.generate_unit_test()
+        self.print("\n🤖 AI:", style="blue")
+        self.print_code(response)
+    
+    def _cmd_integration(self, user_input: str):
+        """Generate and print an integration test"""
+        response = self.generate_integration_test()
+        self.print("\n🤖 AI:", style="blue")
+        self.print_code(response)
+    
+    def _cmd_both(self, user_input: str):
+        """Generate and print unit + integration tests"""
+        if not self.current_java_class:
+            self.print(self.generate_both(), style="yellow")
+            return
+        self.generate_both()
+        for test_type, code in self.generated_tests.items():
+            self.print(f"\n🤖 AI ({test_type} test):", style="blue")
+            self.print_code(code)
+    
+    def _cmd_save(self, user_input: str):
+        """Save the current test to file"""
+        result = self.save_test()
+        self.print(result, style="green")
+    
+    def _cmd_show(self, user_input: str):
+        """Print the current test"""
+        if self.current_test_code:
+            self.print("\n📄 Current Test:", style="blue")
+            self.print_code(self.current_test_code)
+        else:
+            self.print("No test generated yet.", style="yellow")
+    
+    def _cmd_reset(self, user_input: str):
+        """Reset chat history and loaded state"""
+        self.ai_client.reset_chat()
+        self.ai_client.send_message(self.prompt_builder.build_system_prompt())
+        self.current_test_code = None
+        self.current_test_type = None
+        self.current_java_class = None
+        self.generated_tests = {}
+        self.dep_graph.invalidate_index()  # Pick up classes added since the session started
+        self.parser.invalidate_index()
+        self.print("✅ Chat reset.", style="green")
+    
+    def _cmd_clear(self, user_input: str):
+        """Clear the console screen"""
+        if self.console:
+            self.console.clear()
+        else:
+            sys.stdout.write("\x1b[2J\x1b[H")
+            sys.stdout.flush()
+        self.print("🧹 Console cleared.", style="green")
+    
+    def _cmd_validate(self, user_input: str):
+        """Compile, run and auto-fix the current test"""
+        if not self.current_test_code or not self.current_java_class:
+            self.print("❌ No test to validate. Generate a test first.", style="red")
+            return
+        
+        self.print("\n🔬 Validating test (compile → run → auto-fix)...", style="yellow")
+        fixed_code, success = self.validator.validate_and_fix(
+            self.current_test_code,
+            self.current_java_class.name,
+            self.current_java_class.package
+        )
+        self.current_test_code = fixed_code
+        self.generated_tests[self.current_test_type] = fixed_code
+        if success:
+            self.print("\n✅ Test validated successfully!", style="green")
+        else:
+            self.print("\n⚠️ Validation completed with issues. Test code updated.", style="yellow")
+        self.print("\nType 'save' to save the test or 'show' to see it.")
+    
+    def _cmd_deps(self, user_input: str):
+        """Show dependency analysis for the loaded class"""
+        if not self.current_java_class:
+            self.print("❌ No class loaded. Use 'load <filepath>' first.", style="red")
+            return
+        
+        self.print("\n📊 Dependency Analysis:", style="cyan")
+        graph = self.dep_graph.build_graph_for_class(self.current_java_class.file_path)
+        mocks = self.dep_graph.get_all_required_mocks(graph, self.current_java_class.name)
+        for dep, methods in mocks.items():
+            self.print(f"   @Mock {dep}: {', '.join(methods) if methods else 'inject only'}")
+    
+    def _cmd_chat(self, user_input: str):
+        """Refine the current test, or ask a general question"""
+        # Treat as feedback for refinement
+        if self.current_test_code:
+            response = self.refine_test(user_input)
+            self.print("\n🤖 AI:", style="blue")
+            self.print_code(response)
+        else:
+            # General question
+            response = self.ai_client.send_message(user_input)
+            self.print("\n🤖 AI:", style="blue")
+            self.print_markdown(response)
     
     def run(self):
         """Main chat loop"""
@@ -380,16 +668,35 @@ After generating a test, just type your feedback to refine it:
         
         self.print("\n✅ AI initialized. Type 'help' for commands.\n", style="green")
         
+        # Command word -> handler; a handler returning True ends the session
+        commands = {
+            'quit': self._cmd_quit,
+            'exit': self._cmd_quit,
+            'help': self._cmd_help,
+            'load': self._cmd_load,
+            'unit': self._cmd_unit,
+            'integration': self._cmd_integration,
+            'both': self._cmd_both,
+            'save': self._cmd_save,
+            'show': self._cmd_show,
+            'reset': self._cmd_reset,
+            'clear': self._cmd_clear,
+            'validate': self._cmd_validate,
+            'deps': self._cmd_deps,
+        }
+        
+        read_input = self._make_prompt(commands)
+        
         while True:
             try:
-                user_input = input("\n🧑 You: ").strip()
+                user_input = read_input("\n🧑 You: ").strip()
                 
                 if not user_input:
                     continue
                 
                 # Auto-detect: If input looks like a class name or .java file, auto-load it
                 first_word = user_input.split()[0]
-                if first_word.endswith('.java') or (first_word[0].isupper() and 'Impl' in first_word or 'Mapper' in first_word or 'Service' in first_word or 'Validator' in first_word or 'Controller' in first_word):
+                if _AUTOLOAD_RE.search(first_word):
                     # Treat as load command
                     class_name = first_word.replace('.java', '')
                     self.print(f"📁 Auto-loading: {class_name}", style="cyan")
@@ -397,96 +704,12 @@ After generating a test, just type your feedback to refine it:
                         self.print("\n💡 Now use 'unit' to generate a test, or 'help' for more commands.", style="yellow")
                     continue
                 
-                # Handle commands
-                cmd = user_input.lower().split()[0]
-                
-                if cmd == "quit" or cmd == "exit":
-                    self.print("\n👋 Goodbye!", style="blue")
+                # Handle commands; anything else is chat/refinement feedback
+                handler = commands.get(first_word.lower(), self._cmd_chat)
+                if handler(user_input):
                     break
-                
-                elif cmd == "help":
-                    self.show_help()
-                
-                elif cmd == "load":
-                    parts = user_input.split(maxsplit=1)
-                    if len(parts) < 2:
-                        self.print("Usage: load <filepath>", style="red")
-                    else:
-                        self.load_source_file(parts[1])
-                
-                elif cmd == "unit":
-                    response = self.generate_unit_test()
-                    self.print("\n🤖 AI:", style="blue")
-                    self.print_code(response)
-                
-                elif cmd == "integration":
-                    response = self.generate_integration_test()
-                    self.print("\n🤖 AI:", style="blue")
-                    self.print_code(response)
-                
-                elif cmd == "save":
-                    result = self.save_test()
-                    self.print(result, style="green")
-                
-                elif cmd == "show":
-                    if self.current_test_code:
-                        self.print("\n📄 Current Test:", style="blue")
-                        self.print_code(self.current_test_code)
-                    else:
-                        self.print("No test generated yet.", style="yellow")
-                
-                elif cmd == "reset":
-                    self.ai_client.reset_chat()
-                    self.ai_client.send_message(self.prompt_builder.build_system_prompt())
-                    self.current_test_code = None
-                    self.current_java_class = None
-                    self.print("✅ Chat reset.", style="green")
-                
-                elif cmd == "clear":
-                    # Clear the console screen
-                    os.system('cls' if os.name == 'nt' else 'clear')
-                    self.print("🧹 Console cleared.", style="green")
-                
-                elif cmd == "validate":
-                    if not self.current_test_code or not self.current_java_class:
-                        self.print("❌ No test to validate. Generate a test first.", style="red")
-                    else:
-                        self.print("\n🔬 Validating test (compile → run → auto-fix)...", style="yellow")
-                        fixed_code, success = self.validator.validate_and_fix(
-                            self.current_test_code,
-                            self.current_java_class.name,
-                            self.current_java_class.package
-                        )
-                        self.current_test_code = fixed_code
-                        if success:
-                            self.print("\n✅ Test validated successfully!", style="green")
-                        else:
-                            self.print("\n⚠️ Validation completed with issues. Test code updated.", style="yellow")
-                        self.print("\nType 'save' to save the test or 'show' to see it.")
-                
-                elif cmd == "deps":
-                    if not self.current_java_class:
-                        self.print("❌ No class loaded. Use 'load <filepath>' first.", style="red")
-                    else:
-                        self.print("\n📊 Dependency Analysis:", style="cyan")
-                        graph = self.dep_graph.build_graph_for_class(self.current_java_class.file_path)
-                        mocks = self.dep_graph.get_all_required_mocks(graph, self.current_java_class.name)
-                        for dep, methods in mocks.items():
-                            self.print(f"   @Mock {dep}: {', '.join(methods) if methods else 'inject only'}")
-                
-                else:
-                    # Treat as feedback for refinement
-                    if self.current_test_code:
-                        response = self.refine_test(user_input)
-                        self.print("\n🤖 AI:", style="blue")
-                        self.print_code(response)
-                    else:
-                        # General question
-                        response = self.ai_client.send_message(user_input)
-                        self.print("\n🤖 AI:", style="blue")
-                        self.print_markdown(response)
             
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 self.print("\n\n👋 Goodbye!", style="blue")
                 break
             except Exception as e:
@@ -501,10 +724,13 @@ def main():
                         help='Java file to generate tests for (optional)')
     parser.add_argument('--type', '-t', choices=['unit', 'integration'],
                         help='Test type to generate (optional)')
+    parser.add_argument('--build-cache', action='store_true',
+                        help='Validate with the Maven build cache extension (Maven 3.9+); '
+                             'adds it to the project\'s .mvn/ if not configured')
     
     args = parser.parse_args()
     
-    chat = TestGeneratorChat(args.project)
+    chat = TestGeneratorChat(args.project, use_build_cache=args.build_cache)
     
     # If file provided, load it
     if args.file:
@@ -1,27 +1,48 @@
 """
 AI Client for Google Gemini API (using new google.genai SDK)
 """
+import hashlib
+import json
 import os
-from typing import Optional
-from datetime import datetime
+import random
+import time
+from pathlib import Path
+from typing import Iterator, Optional
 
 try:
     from google import genai
-    from google.genai import types
+    from google.genai import errors, types
 except ImportError:
     genai = None
+    errors = None
     types = None
 
+# Full prompts are written here when TESTGEN_DEBUG_PROMPTS is set
+PROMPT_LOG_FILE = ".testgen-prompts.log"
+
+# HTTP status codes worth retrying: rate limited, unavailable, deadline exceeded
+RETRYABLE_STATUS_CODES = frozenset({429, 503, 504})
+MAX_RETRY_DELAY = 30
+
+# Exchanges kept when chat history is saved, after the system prompt exchange; older
+# ones are dropped so a resumed history cannot grow past the model's context
+MAX_SAVED_TURNS = 10
+
 
 class AIClient:
     """Client for interacting with Google Gemini API"""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.5-pro", verbose: bool = True):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.5-pro", verbose: bool = True,
+                 history_path: Optional[str] = None):
         self.model_name = model
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
         self.client = None
         self.chat = None
         self.verbose = verbose
+        self._t0 = time.monotonic()  # Log lines show seconds since the client was created
+        # Chat history is persisted here once resume_session() has been called
+        self.history_path = Path(history_path) if history_path else None
+        self._history_key = None
         
         if not self.api_key:
             raise ValueError(
@@ -43,44 +64,149 @@ class AIClient:
         self.client = genai.Client(api_key=self.api_key)
         self.chat = self.client.chats.create(model=self.model_name)
     
+    def resume_session(self, system_prompt: str) -> bool:
+        """Restore the chat history saved for this system prompt.
+        
+        Returns True if a matching history was loaded, in which case the system
+        prompt does not need to be sent again. Either way, subsequent messages
+        are persisted to history_path.
+        """
+        if not self.history_path:
+            return False
+        
+        self._history_key = hashlib.sha256(f"{self.model_name}\n{system_prompt}".encode('utf-8')).hexdigest()
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        try:
+            if saved.get('key') != self._history_key or not saved.get('history'):
+                return False
+            # pydantic's ValidationError is a ValueError; a corrupt file just means a fresh session
+            history = self._trim_history([types.Content.model_validate(content) for content in saved['history']])
+        except (ValueError, TypeError, AttributeError) as e:
+            self._log(f"Ignoring unreadable chat history: {e}")
+            return False
+        
+        self.chat = self.client.chats.create(model=self.model_name, history=history)
+        self._log(f"Resumed chat history ({len(history)} turns)")
+        return True
+    
+    def _save_history(self):
+        """Atomically write the current chat history to history_path"""
+        if not self.history_path or not self._history_key:
+            return
+        
+        try:
+            history = [content.model_dump(mode='json', exclude_none=True)
+                       for content in self._trim_history(self.chat.get_history())]
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.history_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': self._history_key, 'history': history}, f)
+            os.replace(tmp_path, self.history_path)
+        except Exception as e:
+            self._log(f"Could not save chat history: {e}")
+    
+    def _trim_history(self, history: list) -> list:
+        """The system prompt exchange plus the last MAX_SAVED_TURNS exchanges"""
+        recent = history[2:][-2 * MAX_SAVED_TURNS:]
+        if recent and recent[0].role != 'user':
+            recent = recent[1:]  # Start on a user message, as the API expects
+        return list(history[:2]) + recent
+    
     def _log(self, message: str):
         """Log message if verbose mode is on"""
         if self.verbose:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            print(f"[{timestamp}] 🔵 {message}")
+            print(f"[+{time.monotonic() - self._t0:6.2f}s] 🔵 {message}")
+    
+    def _log_prompt(self, message: str):
+        """Log prompt size; append the full prompt to a file if TESTGEN_DEBUG_PROMPTS is set"""
+        line_count = message.count('\n') + 1
+        self._log(f"Sending prompt ({len(message):,} chars, {line_count} lines)")
+        if os.environ.get("TESTGEN_DEBUG_PROMPTS"):
+            with open(PROMPT_LOG_FILE, 'a', encoding='utf-8') as f:
+                f.write(message + "\n---\n")
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Check whether an SDK error is a transient provider failure"""
+        return isinstance(error, errors.APIError) and error.code in RETRYABLE_STATUS_CODES
+    
+    def _backoff(self, attempt: int, error: Exception):
+        """Sleep with jittered exponential backoff before the next attempt"""
+        delay = min(2 ** attempt + random.random(), MAX_RETRY_DELAY)
+        self._log(f"Transient error ({error.code}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+    
+    def _call_with_retry(self, fn, max_attempts: int = 3):
+        """Call fn, retrying transient API errors; other errors are re-raised immediately"""
+        for attempt in range(max_attempts):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == max_attempts - 1 or not self._is_retryable(e):
+                    raise
+                self._backoff(attempt, e)
     
     def send_message(self, message: str) -> str:
         """Send a message and get a response (maintains chat history)"""
         try:
-            # Log the full prompt being sent
-            prompt_lines = message.split('\n')
-            self._log(f"Sending prompt ({len(message):,} chars, {len(prompt_lines)} lines)")
-            self._log("=" * 60)
-            self._log("PROMPT MESSAGE:")
-            self._log("=" * 60)
-            print(message)  # Print full prompt
-            self._log("=" * 60)
+            self._log_prompt(message)
             
-            start_time = datetime.now()
-            response = self.chat.send_message(message)
-            elapsed = (datetime.now() - start_time).total_seconds()
+            start_time = time.monotonic()
+            # The chat only records a turn once a response arrives, so a retry is safe
+            response = self._call_with_retry(lambda: self.chat.send_message(message))
+            elapsed = time.monotonic() - start_time
             
             self._log(f"Response received ({len(response.text):,} chars) in {elapsed:.1f}s")
+            self._save_history()
             
             return response.text
         except Exception as e:
             self._log(f"ERROR: {str(e)}")
             return f"Error from AI: {str(e)}"
     
-    def generate_once(self, prompt: str) -> str:
+    def send_message_stream(self, message: str) -> Iterator[str]:
+        """Send a message and yield response text chunks as they arrive (maintains chat history)"""
+        try:
+            self._log_prompt(message)
+            
+            start_time = time.monotonic()
+            received = 0
+            max_attempts = 3
+            for attempt in range(max_attempts):
+                try:
+                    for chunk in self.chat.send_message_stream(message):
+                        if chunk.text:
+                            received += len(chunk.text)
+                            yield chunk.text
+                    break
+                except Exception as e:
+                    # Once text has been shown, a retry would duplicate it
+                    if received or attempt == max_attempts - 1 or not self._is_retryable(e):
+                        raise
+                    self._backoff(attempt, e)
+            elapsed = time.monotonic() - start_time
+            
+            self._log(f"Response streamed ({received:,} chars) in {elapsed:.1f}s")
+            self._save_history()
+        except Exception as e:
+            self._log(f"ERROR: {str(e)}")
+            yield f"Error from AI: {str(e)}"
+    
+    def generate_once(self, prompt: str, temperature: Optional[float] = None) -> str:
         """One-shot generation without chat history"""
         try:
             self._log(f"One-shot generation ({len(prompt):,} chars)")
             
-            response = self.client.models.generate_content(
+            config = types.GenerateContentConfig(temperature=temperature) if temperature is not None else None
+            response = self._call_with_retry(lambda: self.client.models.generate_content(
                 model=self.model_name,
-                contents=prompt
-            )
+                contents=prompt,
+                config=config
+            ))
             return response.text
         except Exception as e:
             return f"Error from AI: {str(e)}"
@@ -89,6 +215,8 @@ class AIClient:
         """Reset the chat history"""
         self._log("Resetting chat history")
         self.chat = self.client.chats.create(model=self.model_name)
+        if self.history_path and self.history_path.exists():
+            self.history_path.unlink()
 
 
 if __name__ == "__main__":
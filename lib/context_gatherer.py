@@ -2,20 +2,124 @@
 Context Gatherer - Collect repository context for AI prompts
 Includes metadata.txt, architecture.md, and comprehensive project scan
 """
+import functools
+import json
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, List
 
+# Extraction patterns, compiled once at import. They run on the raw file bytes during the
+# project scan, so only the captured (ASCII) identifiers are ever decoded
+# Captures the constant list: everything after '{' up to the first ';' (fields/methods) or '}'
+_ENUM_RE = re.compile(rb'enum\s+\w+\s*\{(?=[^}])([^};]*)')
+_ENUM_VAL_RE = re.compile(rb'\b([A-Z][A-Z0-9_]+)\b')
+_METHOD_RE = re.compile(rb'(?:public|protected)\s+(?:\w+(?:<[^>]+>)?)\s+(\w+)\s*\([^)]*\)')
+_DEP_RE = re.compile(rb'private\s+(?:final\s+)?(\w+(?:Service|Validator|Dao|Mapper|Repository))\s+\w+')
+
+# Cap on enum values / methods recorded per class
+MAX_EXTRACTED = 20
+
+# Bytes read from an uncategorized file to check whether it declares an enum
+ENUM_SNIFF_BYTES = 4096
+
+# (marker text, pattern flag) checked against existing test previews
+TEST_PATTERN_MARKERS = (
+    ('Instancio', 'uses_instancio'),
+    ('@Mock', 'uses_mockito'),
+    ('@Nested', 'uses_nested'),
+    ('assertThat', 'uses_assertj'),
+)
+
+# Test previews never need more than the start of the file
+PREVIEW_BYTES = 16384
+
+# Bump when the extracted per-file data changes shape, to discard old scan caches
+SCAN_CACHE_VERSION = 1
+
+# Characters of each related file quoted in test generation prompts
+RELATED_PROMPT_CHARS = 3000
+
+# Leftover temp files from interrupted cache writes are removed after this
+STALE_TMP_SECONDS = 3600
+
+
+@functools.lru_cache(maxsize=2048)
+def _read_text_cached(path: str, mtime_ns: int) -> str:
+    """Read and decode a source file; cached per path and modification time"""
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8', 'replace')
+
+
+def _scandir_java(path: str, files_first: bool = False):
+    """
+    Yield os.DirEntry objects for all .java files below path, reusing scandir's cached metadata
+    files_first yields each directory's files before descending into it, in Path.rglob order
+    """
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if files_first:
+                        subdirs.append(entry.path)
+                    else:
+                        yield from _scandir_java(entry.path)
+                elif entry.name.endswith('.java') and entry.is_file(follow_symlinks=False):
+                    yield entry
+    except OSError:
+        return
+    for subdir in subdirs:
+        yield from _scandir_java(subdir, files_first=True)
+
+
+def _prune_cache_dir(cache_dir, max_files: int, suffix: str, obsolete_suffixes: tuple = ()):
+    """
+    Delete the least recently modified files ending in suffix beyond max_files, plus files
+    with an obsolete suffix and stale temp files; readers touch entries they reuse
+    """
+    entries = []
+    stale_before = time.time() - STALE_TMP_SECONDS
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                try:
+                    mtime = entry.stat().st_mtime
+                    if entry.name.endswith(suffix):
+                        entries.append((mtime, entry.path))
+                    elif entry.name.endswith(obsolete_suffixes) or (entry.name.endswith('.tmp') and mtime < stale_before):
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        return
+    
+    entries.sort(reverse=True)
+    for _, path in entries[max_files:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 
 class ContextGatherer:
     """Gather project context for AI prompts"""
     
     def __init__(self, project_root: str):
         self.project_root = Path(project_root)
+        # Scanned paths start with this prefix; slicing it off gives the project-relative path
+        self._root_prefix = str(self.project_root) + os.sep
         self.metadata_cache = None
+        self.metadata_summary_cache = None
         self.architecture_cache = None
         self.project_context_cache = None
+        self.project_summary_cache = None
+        self.truncated_summary_cache = {}  # (summary name, max_len) -> truncated text
+        self.scan_cache_path = self.project_root / ".test-generator-cache" / "project_context.json"
+        # Related file contents keyed by ((key, path, mtime_ns), ...)
+        self._related_cached = functools.lru_cache(maxsize=128)(self._load_related_files)
         
         # Build comprehensive context at initialization
         self._build_project_context()
@@ -23,6 +127,8 @@ class ContextGatherer:
     def _build_project_context(self):
         """Scan entire project and build comprehensive context"""
         print("📚 Building project context...")
+        self.project_summary_cache = None
+        self.truncated_summary_cache = {}
         
         self.project_context_cache = {
             'entities': {},
@@ -37,11 +143,47 @@ class ContextGatherer:
         src_path = self.project_root / "src" / "main" / "java"
         test_path = self.project_root / "src" / "test" / "java"
         
-        if src_path.exists():
-            self._scan_directory(src_path, 'main')
+        entries, source_types = [], []
+        for path, source_type in ((src_path, 'main'), (test_path, 'test')):
+            if path.exists():
+                for entry in _scandir_java(str(path)):
+                    entries.append(entry)
+                    source_types.append(source_type)
+        
+        # Per-file results from the last run are reused when the file's mtime is unchanged
+        cached_files = self._load_scan_cache()
+        scanned = {}  # path -> (mtime_ns, result)
+        stale_entries, stale_types = [], []
+        for entry, source_type in zip(entries, source_types):
+            try:
+                mtime_ns = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+            hit = cached_files.get(entry.path)
+            if hit and hit[0] == mtime_ns:
+                scanned[entry.path] = hit
+            else:
+                scanned[entry.path] = (mtime_ns, None)
+                stale_entries.append(entry)
+                stale_types.append(source_type)
+        
+        # Files are independent and reading dominates, so classify them on an I/O-sized pool
+        if stale_entries:
+            workers = min(32, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(self._classify_and_extract, stale_entries, stale_types)
+                for entry, result in zip(stale_entries, results):
+                    scanned[entry.path] = (scanned[entry.path][0], result)
+        
+        # Insert in scan order so the context does not depend on which files were cached
+        for entry in entries:
+            result = scanned.get(entry.path, (None, None))[1]
+            if result:
+                category, name, info = result
+                self.project_context_cache[category][name] = info
         
-        if test_path.exists():
-            self._scan_directory(test_path, 'test')
+        if stale_entries or len(scanned) != len(cached_files):
+            self._save_scan_cache(scanned)
         
         # Extract patterns from existing tests
         self._extract_test_patterns()
@@ -53,109 +195,142 @@ class ContextGatherer:
         print(f"   ✅ Found {len(self.project_context_cache['enums'])} enums")
         print(f"   ✅ Found {len(self.project_context_cache['existing_tests'])} existing tests")
     
-    def _scan_directory(self, path: Path, source_type: str):
-        """Recursively scan directory for Java files"""
-        for java_file in path.rglob("*.java"):
-            file_name = java_file.stem
-            relative_path = str(java_file.relative_to(self.project_root))
-            
-            # Categorize files
-            if source_type == 'main':
-                # First check if it's an enum by reading file content
-                if self._is_enum_file(java_file):
-                    enum_values = self._extract_enum_values(java_file)
-                    self.project_context_cache['enums'][file_name] = {
-                        'path': relative_path,
-                        'values': enum_values
-                    }
-                elif file_name.endswith('Entity'):
-                    self.project_context_cache['entities'][file_name] = {
-                        'path': relative_path,
-                        'methods': self._extract_methods(java_file)
-                    }
-                elif file_name.endswith('ServiceImpl'):
-                    self.project_context_cache['services'][file_name] = {
-                        'path': relative_path,
-                        'methods': self._extract_methods(java_file),
-                        'dependencies': self._extract_dependencies(java_file)
-                    }
-                elif file_name.endswith('Mapper'):
-                    self.project_context_cache['mappers'][file_name] = {
-                        'path': relative_path,
-                        'methods': self._extract_methods(java_file)
-                    }
-                elif file_name.endswith('Validator'):
-                    self.project_context_cache['validators'][file_name] = {
-                        'path': relative_path,
-                        'methods': self._extract_methods(java_file)
-                    }
-            elif source_type == 'test':
-                if file_name.endswith('Test'):
-                    self.project_context_cache['existing_tests'][file_name] = {
-                        'path': relative_path,
-                        'content_preview': self._get_file_preview(java_file, 100)
-                    }
+    def _load_scan_cache(self) -> dict:
+        """Load per-file scan results saved by the previous run, keyed by path"""
+        # JSON rather than pickle: the cache lives inside the scanned repository, so it may
+        # come from someone else's commit and must not be able to run code when loaded
+        try:
+            with open(self.scan_cache_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(saved, dict) or saved.get('version') != SCAN_CACHE_VERSION:
+            return {}
+        files = saved.get('files')
+        if not isinstance(files, dict):
+            return {}
+        # Entries are [mtime_ns, [category, class_name, info] or null]; anything else is rescanned
+        return {
+            path: entry for path, entry in files.items()
+            if isinstance(entry, list) and len(entry) == 2
+            and (entry[1] is None or self._valid_scan_result(entry[1]))
+        }
     
-    def _is_enum_file(self, file_path: Path) -> bool:
-        """Check if a Java file is an enum by looking for 'public enum' keyword"""
+    def _valid_scan_result(self, result) -> bool:
+        """Check the shape of a cached _classify_and_extract result"""
+        return (isinstance(result, list) and len(result) == 3 and result[0] in self.project_context_cache
+                and isinstance(result[1], str) and isinstance(result[2], dict))
+    
+    def _save_scan_cache(self, files: dict):
+        """Atomically write per-file scan results for the next run"""
         try:
-            content = file_path.read_text(encoding='utf-8')
-            return 'public enum ' in content
-        except:
-            return False
+            self.scan_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.scan_cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': SCAN_CACHE_VERSION, 'files': files}, f)
+            os.replace(tmp_path, self.scan_cache_path)
+        except OSError as e:
+            print(f"   ⚠️  Could not save project scan cache: {e}")
     
-    def _extract_enum_values(self, file_path: Path) -> List[str]:
-        """Extract enum values from an enum file"""
-        values = []
+    def _classify_and_extract(self, entry: os.DirEntry, source_type: str) -> Optional[tuple]:
+        """
+        Categorize one Java file and extract its metadata
+        Returns (category, class_name, info) or None if the file is not of interest
+        """
+        file_name = entry.name[:-5]
+        path = entry.path
+        relative_path = path[len(self._root_prefix):] if path.startswith(self._root_prefix) else path
+        
+        if source_type == 'test':
+            if file_name.endswith('Test'):
+                return 'existing_tests', file_name, {
+                    'path': relative_path,
+                    'content_preview': self._get_file_preview(self._read_source(entry, PREVIEW_BYTES), 100)
+                }
+            return None
+        
+        # Known suffixes decide the category from the name alone
+        if file_name.endswith('Entity'):
+            return 'entities', file_name, {
+                'path': relative_path,
+                'methods': self._extract_methods(self._read_source(entry))
+            }
+        elif file_name.endswith('ServiceImpl'):
+            # Each file is read once; all extractors run on the same buffer
+            content = self._read_source(entry)
+            return 'services', file_name, {
+                'path': relative_path,
+                'methods': self._extract_methods(content),
+                'dependencies': self._extract_dependencies(content)
+            }
+        elif file_name.endswith('Mapper'):
+            return 'mappers', file_name, {
+                'path': relative_path,
+                'methods': self._extract_methods(self._read_source(entry))
+            }
+        elif file_name.endswith('Validator'):
+            return 'validators', file_name, {
+                'path': relative_path,
+                'methods': self._extract_methods(self._read_source(entry))
+            }
+        # Anything else is only of interest if it is an enum, which is declared near the top
+        elif self._is_enum_file(self._read_source(entry, ENUM_SNIFF_BYTES)):
+            return 'enums', file_name, {
+                'path': relative_path,
+                'values': self._extract_enum_values(self._read_source(entry))
+            }
+        return None
+    
+    def _read_source(self, entry: os.DirEntry, size: int = -1) -> bytes:
+        """Read a Java file (or its first size bytes) found by the scan; empty if it cannot be read"""
         try:
-            content = file_path.read_text(encoding='utf-8')
-            # Match enum values (uppercase identifiers after '{' and before first method or '}')
-            match = re.search(r'enum\s+\w+\s*\{([^}]+)', content)
-            if match:
-                enum_body = match.group(1)
-                # Extract just the enum constants (before any semicolon or method)
-                if ';' in enum_body:
-                    enum_body = enum_body.split(';')[0]
-                # Match uppercase identifiers (enum values)
-                values = re.findall(r'\b([A-Z][A-Z0-9_]+)\b', enum_body)
-                values = list(dict.fromkeys(values))[:20]  # Remove duplicates, limit to 20
-        except:
-            pass
-        return values
+            with open(entry.path, 'rb') as f:
+                return f.read(size)
+        except OSError:
+            return b""
+    
+    def _is_enum_file(self, content: bytes) -> bool:
+        """Check if a Java file is an enum by looking for 'public enum' keyword"""
+        return b'public enum ' in content
+    
+    def _extract_enum_values(self, content: bytes) -> List[str]:
+        """Extract enum values from an enum file"""
+        # The enum regex already stops at the first ';', so the match is just the constants
+        match = _ENUM_RE.search(content)
+        if not match:
+            return []
+        # Match uppercase identifiers (enum values)
+        return self._first_unique(_ENUM_VAL_RE.finditer(match.group(1)), MAX_EXTRACTED)
     
-    def _extract_methods(self, file_path: Path) -> List[str]:
+    def _extract_methods(self, content: bytes) -> List[str]:
         """Extract method signatures from a Java file"""
-        methods = []
-        try:
-            content = file_path.read_text(encoding='utf-8')
-            # Match public/protected methods
-            pattern = r'(?:public|protected)\s+(?:\w+(?:<[^>]+>)?)\s+(\w+)\s*\([^)]*\)'
-            matches = re.findall(pattern, content)
-            methods = list(set(matches))[:20]  # Limit to 20 methods
-        except:
-            pass
-        return methods
+        # Match public/protected methods
+        return self._first_unique(_METHOD_RE.finditer(content), MAX_EXTRACTED)
     
-    def _extract_dependencies(self, file_path: Path) -> List[str]:
+    def _extract_dependencies(self, content: bytes) -> List[str]:
         """Extract injected dependencies from a service file"""
-        dependencies = []
-        try:
-            content = file_path.read_text(encoding='utf-8')
-            # Match field injections
-            pattern = r'private\s+(?:final\s+)?(\w+(?:Service|Validator|Dao|Mapper|Repository))\s+\w+'
-            matches = re.findall(pattern, content)
-            dependencies = list(set(matches))
-        except:
-            pass
-        return dependencies
+        # Match field injections
+        return self._first_unique(_DEP_RE.finditer(content))
+    
+    def _first_unique(self, matches, limit: Optional[int] = None) -> List[str]:
+        """Collect group(1) of each match in source order without duplicates, stopping at limit"""
+        found = {}
+        for match in matches:
+            found[match.group(1).decode('ascii')] = None
+            if limit and len(found) >= limit:
+                break
+        return list(found)
     
-    def _get_file_preview(self, file_path: Path, lines: int = 50) -> str:
+    def _get_file_preview(self, content: bytes, lines: int = 50) -> str:
         """Get first N lines of a file"""
-        try:
-            content = file_path.read_text(encoding='utf-8')
-            return '\n'.join(content.split('\n')[:lines])
-        except:
-            return ""
+        # Find the end of line N instead of splitting the whole buffer into lines
+        pos = 0
+        for _ in range(lines):
+            end = content.find(b'\n', pos)
+            if end == -1:
+                return content.decode('utf-8', 'replace')
+            pos = end + 1
+        return content[:pos - 1].decode('utf-8', 'replace')
     
     def _extract_test_patterns(self):
         """Extract common patterns from existing tests"""
@@ -167,16 +342,16 @@ class ContextGatherer:
             'common_setup': []
         }
         
-        for test_name, test_info in self.project_context_cache['existing_tests'].items():
+        pending = TEST_PATTERN_MARKERS
+        for test_info in self.project_context_cache['existing_tests'].values():
             content = test_info.get('content_preview', '')
-            if 'Instancio' in content:
-                patterns['uses_instancio'] = True
-            if '@Mock' in content:
-                patterns['uses_mockito'] = True
-            if '@Nested' in content:
-                patterns['uses_nested'] = True
-            if 'assertThat' in content:
-                patterns['uses_assertj'] = True
+            for needle, flag in pending:
+                if needle in content:
+                    patterns[flag] = True
+            pending = [(needle, flag) for needle, flag in pending if not patterns[flag]]
+            # Stop once every pattern has been seen
+            if not pending:
+                break
         
         self.project_context_cache['common_patterns'] = patterns
     
@@ -184,6 +359,8 @@ class ContextGatherer:
         """Get a summary of the entire project for AI context"""
         if not self.project_context_cache:
             return ""
+        if self.project_summary_cache is not None:
+            return self.project_summary_cache
         
         summary = []
         summary.append("## PROJECT STRUCTURE SUMMARY\n")
@@ -215,7 +392,8 @@ class ContextGatherer:
         summary.append(f"- Uses Mockito: {patterns.get('uses_mockito', False)}")
         summary.append(f"- Uses AssertJ: {patterns.get('uses_assertj', False)}")
         
-        return '\n'.join(summary)
+        self.project_summary_cache = '\n'.join(summary)
+        return self.project_summary_cache
     
     def get_service_dependencies(self, service_name: str) -> List[str]:
         """Get dependencies for a specific service"""
@@ -237,37 +415,52 @@ class ContextGatherer:
     
     def get_metadata_summary(self) -> str:
         """Get a condensed version of metadata for prompts (to save tokens)"""
-        full_metadata = self.get_metadata()
-        if not full_metadata:
+        if self.metadata_summary_cache is not None:
+            return self.metadata_summary_cache
+        
+        metadata_path = self.project_root / "metadata.txt"
+        if not metadata_path.exists():
             return "No metadata available."
         
         # Extract key sections: ER diagram and sample records
-        lines = full_metadata.split('\n')
+        # The file is streamed line by line so only the summary is ever held in memory
         summary_lines = []
         include_section = False
         section_count = 0
         
-        for line in lines:
-            # Include ER diagram section
-            if 'ER DIAGRAM' in line or 'ENTITY LIST' in line:
-                include_section = True
-                section_count = 0
-            elif 'SAMPLE RECORDS' in line:
-                include_section = True
-                section_count = 0
-            elif line.startswith('===') and include_section:
-                section_count += 1
-                if section_count > 1:
-                    include_section = False
-            
-            if include_section:
-                summary_lines.append(line)
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                # Include ER diagram section
+                if 'ER DIAGRAM' in line or 'ENTITY LIST' in line:
+                    include_section = True
+                    section_count = 0
+                elif 'SAMPLE RECORDS' in line:
+                    include_section = True
+                    section_count = 0
+                elif line.startswith('===') and include_section:
+                    section_count += 1
+                    if section_count > 1:
+                        include_section = False
+                
+                if include_section:
+                    summary_lines.append(line)
+                
+                # Limit size
+                if len(summary_lines) > 200:
+                    break
             
-            # Limit size
-            if len(summary_lines) > 200:
-                break
+            if summary_lines:
+                summary = '\n'.join(summary_lines)
+            else:
+                f.seek(0)
+                summary = f.read(3000)
+        
+        if not summary:
+            return "No metadata available."
         
-        return '\n'.join(summary_lines) if summary_lines else full_metadata[:3000]
+        self.metadata_summary_cache = summary
+        return summary
     
     def get_architecture(self) -> str:
         """Load architecture.md with coding conventions"""
@@ -294,26 +487,65 @@ class ContextGatherer:
         
         return full_arch[:2000]  # Fallback: first 2000 chars
     
+    def get_project_summary_truncated(self, max_len: int = 3000) -> str:
+        """Project summary cut to max_len chars, computed once for prompt building"""
+        return self._truncated_summary('project', self.get_project_summary, max_len)
+    
+    def get_architecture_summary_truncated(self, max_len: int = 2000) -> str:
+        """Architecture summary cut to max_len chars, computed once for prompt building"""
+        return self._truncated_summary('architecture', self.get_architecture_summary, max_len)
+    
+    def get_metadata_summary_truncated(self, max_len: int = 2000) -> str:
+        """Metadata summary cut to max_len chars, computed once for prompt building"""
+        return self._truncated_summary('metadata', self.get_metadata_summary, max_len)
+    
+    def _truncated_summary(self, name: str, getter, max_len: int) -> str:
+        """Return getter()[:max_len], cached per (name, max_len)"""
+        key = (name, max_len)
+        if key not in self.truncated_summary_cache:
+            self.truncated_summary_cache[key] = getter()[:max_len]
+        return self.truncated_summary_cache[key]
+    
     def get_file_content(self, file_path: str) -> str:
         """Read content of a source file"""
         path = Path(file_path)
         if not path.is_absolute():
             path = self.project_root / file_path
         
-        if path.exists():
-            with open(path, 'r', encoding='utf-8') as f:
-                return f.read()
-        return ""
+        try:
+            return _read_text_cached(str(path), path.stat().st_mtime_ns)
+        except OSError:
+            return ""
     
     def get_related_files_content(self, related_files: dict) -> dict:
         """Get content of related files (Entity, DTO, etc.)"""
+        cache_key = tuple(
+            (key, file_path, self._mtime_ns(file_path))
+            for key, file_path in related_files.items()
+        )
+        return dict(self._related_cached(cache_key))
+    
+    def _mtime_ns(self, file_path: str) -> int:
+        """Modification time of a project file, or -1 if it does not exist"""
+        path = Path(file_path)
+        if not path.is_absolute():
+            path = self.project_root / file_path
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return -1
+    
+    def _load_related_files(self, cache_key: tuple) -> dict:
+        """Read related files listed in a get_related_files_content cache key"""
         contents = {}
-        for key, file_path in related_files.items():
+        for key, file_path, _ in cache_key:
             content = self.get_file_content(file_path)
             if content:
                 contents[key] = {
                     'path': file_path,
-                    'content': content
+                    'content': content,
+                    # Truncated once here; shorter files share the same string object
+                    'prompt_content': content if len(content) <= RELATED_PROMPT_CHARS else content[:RELATED_PROMPT_CHARS]
                 }
         return contents
     
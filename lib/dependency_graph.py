@@ -2,10 +2,37 @@
 Dependency Graph Builder - Analyze class dependencies for smart context selection
 Builds a DAG of class dependencies to determine exactly what mocks are needed
 """
+import os
 import re
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Set, Optional
+from typing import Dict, List, Set, Optional, Tuple
 from dataclasses import dataclass, field
+try:
+    from .context_gatherer import _read_text_cached, _scandir_java
+except ImportError:  # Run directly as a script
+    from context_gatherer import _read_text_cached, _scandir_java
+
+# Larger sources are not kept on ClassDependency.content
+MAX_CONTENT_CHARS = 256 * 1024
+
+# Extraction patterns, compiled once at import
+_INTERFACE_RE = re.compile(r'public\s+interface\s+\w+')
+# Match field declarations like: SomeService someService;
+_DEP_RE = re.compile(r'(?:private|protected)\s+(?:final\s+)?(\w+(?:Service|Validator|Dao|Mapper|Repository|Helper))\s+\w+\s*;')
+# SearchMapper<T> style fields
+_GENERIC_DEP_RE = re.compile(r'(?:private|protected)\s+(?:final\s+)?(\w+Mapper)<[^>]+>\s+\w+\s*;')
+_METHOD_DECL_RE = re.compile(r'(?:@Override\s+)?(?:public|protected)\s+(?:\w+(?:<[^>]+>)?)\s+(\w+)\s*\([^)]*\)\s*\{')
+# variableName.methodName(
+_CALL_RE = re.compile(r'(\w+(?:Service|Validator|Dao|Mapper|Helper))\.(\w+)\s*\(')
+# Unqualified or this.-qualified calls; arguments are not consumed so nested calls like a(b(x)) are seen
+_PRIVATE_CALL_RE = re.compile(r'(?:(?<=this\.)|(?<![.\w]))([a-z]\w+)\s*\(')
+_PRIVATE_DECL_RE = re.compile(r'private\s+(?:static\s+)?(?:final\s+)?(?:\w+(?:<[^>]+>)?)\s+(\w+)\s*\([^)]*\)[^;{]*\{')
+# Keywords that look like calls to _PRIVATE_CALL_RE, e.g. "if (...)"
+_CALL_KEYWORDS = frozenset({'if', 'for', 'while', 'return', 'switch', 'new', 'catch', 'synchronized'})
+_GENERIC_STRIP_RE = re.compile(r'<.*>')
+# Role suffix stripped to get a class's domain base name (OrderServiceImpl -> Order)
+_SUFFIX_RE = re.compile(r'(?:ServiceImpl|Service|Validator|Controller)$')
 
 
 @dataclass
@@ -14,13 +41,20 @@ class ClassDependency:
     name: str
     file_path: str
     dependencies: List[str] = field(default_factory=list)  # Injected dependencies
-    method_calls: Dict[str, List[str]] = field(default_factory=dict)  # method -> [calls]
+    method_calls: Dict[str, Set[Tuple[str, str]]] = field(default_factory=dict)  # method -> {(dep, called method)}
+    private_method_calls: Dict[str, Set[Tuple[str, str]]] = field(default_factory=dict)  # Same, for private methods
     is_interface: bool = False
     is_mapper: bool = False
     is_validator: bool = False
     is_service: bool = False
+    content: Optional[str] = None  # Source text, kept for files under MAX_CONTENT_CHARS
     
 
+def _class_name(file_path: str) -> str:
+    """Class name of a Java source path (file name without .java), without building a Path"""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
 class DependencyGraphBuilder:
     """Build dependency graph for Java classes"""
     
@@ -28,6 +62,20 @@ class DependencyGraphBuilder:
         self.project_root = Path(project_root)
         self.src_path = self.project_root / "src" / "main" / "java"
         self.class_cache: Dict[str, ClassDependency] = {}
+        # file path -> (mtime_ns, analyzed class), filled by prewarm() and _analyze_class
+        self._ast_cache: Dict[str, Tuple[int, ClassDependency]] = {}
+        # Class name -> file path, built on first lookup (see _ensure_index)
+        self._class_index: Optional[Dict[str, str]] = None
+    
+    def prewarm(self):
+        """Analyze every class under src/main/java so later graph builds hit the cache"""
+        self._ensure_index()
+        for java_file in list(self._class_index.values()):
+            try:
+                self._analyze_class(java_file)
+            except Exception:
+                # Unreadable files are reported when a graph actually needs them
+                pass
     
     def build_graph_for_class(self, file_path: str) -> Dict[str, ClassDependency]:
         """
@@ -35,14 +83,12 @@ class DependencyGraphBuilder:
         Returns dict of class_name -> ClassDependency for all relevant classes
         """
         graph = {}
-        to_process = [file_path]
-        processed = set()
+        to_process = deque([file_path])
+        # Paths are marked when queued, so a class reachable from several parents is queued once
+        processed = {file_path}
         
         while to_process:
-            current_path = to_process.pop(0)
-            if current_path in processed:
-                continue
-            processed.add(current_path)
+            current_path = to_process.popleft()
             
             try:
                 class_dep = self._analyze_class(current_path)
@@ -53,6 +99,7 @@ class DependencyGraphBuilder:
                     for dep_name in class_dep.dependencies:
                         dep_path = self._find_class_file(dep_name)
                         if dep_path and dep_path not in processed:
+                            processed.add(dep_path)
                             to_process.append(dep_path)
             except Exception as e:
                 print(f"Warning: Could not analyze {current_path}: {e}")
@@ -61,15 +108,20 @@ class DependencyGraphBuilder:
     
     def _analyze_class(self, file_path: str) -> Optional[ClassDependency]:
         """Analyze a single Java class file"""
-        path = Path(file_path)
-        if not path.exists():
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
             return None
         
-        content = path.read_text(encoding='utf-8')
-        class_name = path.stem
+        cached = self._ast_cache.get(file_path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        
+        content = _read_text_cached(file_path, mtime_ns)
+        class_name = _class_name(file_path)
         
         # Detect class type
-        is_interface = bool(re.search(r'public\s+interface\s+\w+', content))
+        is_interface = bool(_INTERFACE_RE.search(content))
         is_mapper = 'Mapper' in class_name or '@Mapper' in content
         is_validator = 'Validator' in class_name
         is_service = 'Service' in class_name
@@ -78,18 +130,22 @@ class DependencyGraphBuilder:
         dependencies = self._extract_dependencies(content)
         
         # Extract method-to-call mapping
-        method_calls = self._extract_method_calls(content)
+        method_calls, private_method_calls = self._extract_method_calls(content)
         
-        return ClassDependency(
+        class_dep = ClassDependency(
             name=class_name,
-            file_path=str(path),
+            file_path=file_path,
             dependencies=dependencies,
             method_calls=method_calls,
+            private_method_calls=private_method_calls,
             is_interface=is_interface,
             is_mapper=is_mapper,
             is_validator=is_validator,
-            is_service=is_service
+            is_service=is_service,
+            content=content if len(content) < MAX_CONTENT_CHARS else None
         )
+        self._ast_cache[file_path] = (mtime_ns, class_dep)
+        return class_dep
     
     def _extract_dependencies(self, content: str) -> List[str]:
         """Extract injected field dependencies"""
@@ -97,25 +153,30 @@ class DependencyGraphBuilder:
         
         # Match field declarations like: SomeService someService;
         # With @RequiredArgsConstructor, all final fields are dependencies
-        pattern = r'(?:private|protected)\s+(?:final\s+)?(\w+(?:Service|Validator|Dao|Mapper|Repository|Helper))\s+\w+\s*;'
-        matches = re.findall(pattern, content)
-        dependencies.extend(matches)
+        dependencies.extend(_DEP_RE.findall(content))
         
         # Also check for SearchMapper<T> pattern
-        generic_pattern = r'(?:private|protected)\s+(?:final\s+)?(\w+Mapper)<[^>]+>\s+\w+\s*;'
-        generic_matches = re.findall(generic_pattern, content)
-        dependencies.extend(generic_matches)
+        dependencies.extend(_GENERIC_DEP_RE.findall(content))
         
-        return list(set(dependencies))
+        return list(dict.fromkeys(dependencies))  # Deduplicate, keeping declaration order
     
-    def _extract_method_calls(self, content: str) -> Dict[str, List[str]]:
-        """Extract method-to-call mapping for each public method"""
-        method_calls = {}
-        
-        # Find all methods
-        method_pattern = r'(?:@Override\s+)?(?:public|protected)\s+(?:\w+(?:<[^>]+>)?)\s+(\w+)\s*\([^)]*\)\s*\{'
+    def _extract_method_calls(self, content: str) -> Tuple[Dict[str, Set[Tuple[str, str]]], Dict[str, Set[Tuple[str, str]]]]:
+        """
+        Extract the method-to-call mapping for public and for private methods
+        Returns: (public method calls, private method calls)
+        """
+        # Private methods declared in this class, collected once for the whole file
+        private_matches = list(_PRIVATE_DECL_RE.finditer(content))
+        private_names = {match.group(1) for match in private_matches}
         
-        for match in re.finditer(method_pattern, content):
+        method_calls = self._collect_calls(content, _METHOD_DECL_RE.finditer(content), private_names)
+        private_method_calls = self._collect_calls(content, private_matches, private_names)
+        return method_calls, private_method_calls
+    
+    def _collect_calls(self, content: str, declarations, private_names: Set[str]) -> Dict[str, Set[Tuple[str, str]]]:
+        """Map each declared method to the dependency and private method calls in its body"""
+        method_calls = {}
+        for match in declarations:
             method_name = match.group(1)
             # Find the method body
             start = match.end()
@@ -125,47 +186,70 @@ class DependencyGraphBuilder:
             calls = set()
             
             # Pattern: variableName.methodName(
-            call_pattern = r'(\w+(?:Service|Validator|Dao|Mapper|Helper))\.(\w+)\s*\('
-            for call_match in re.finditer(call_pattern, body):
-                calls.add(f"{call_match.group(1)}.{call_match.group(2)}()")
+            for call_match in _CALL_RE.finditer(body):
+                calls.add((call_match.group(1), call_match.group(2)))
             
             # Also extract private method calls (same class)
-            private_pattern = r'\b([a-z]\w+)\s*\([^)]*\)'
-            for private_match in re.finditer(private_pattern, body):
+            for private_match in _PRIVATE_CALL_RE.finditer(body):
                 potential_private = private_match.group(1)
+                if potential_private in _CALL_KEYWORDS:
+                    continue
                 # Check if it's a private method in this class
-                if re.search(rf'private\s+\w+\s+{potential_private}\s*\(', content):
-                    calls.add(f"this.{potential_private}()")
+                if potential_private in private_names:
+                    calls.add(('this', potential_private))
             
             if calls:
-                method_calls[method_name] = list(calls)
+                method_calls[method_name] = calls
         
         return method_calls
     
     def _extract_method_body(self, content: str, start: int) -> str:
         """Extract method body starting from given position"""
+        # Jump between braces with str.find instead of walking every character
         depth = 1
         pos = start
-        while pos < len(content) and depth > 0:
-            if content[pos] == '{':
+        while depth > 0:
+            next_open = content.find('{', pos)
+            next_close = content.find('}', pos)
+            if next_close == -1:
+                # Unbalanced: the body runs to the end of the file
+                pos = len(content)
+                break
+            if next_open != -1 and next_open < next_close:
                 depth += 1
-            elif content[pos] == '}':
+                pos = next_open + 1
+            else:
                 depth -= 1
-            pos += 1
+                pos = next_close + 1
         return content[start:pos-1]
     
+    def _ensure_index(self):
+        """Walk src/main/java once and index every class name to its file path"""
+        if self._class_index is not None:
+            return
+        
+        index = {}
+        if self.src_path.exists():
+            for entry in _scandir_java(str(self.src_path)):
+                # Keep the first file found when a name exists in several packages
+                index.setdefault(entry.name[:-5], entry.path)
+        self._class_index = index
+    
+    def invalidate_index(self):
+        """Forget the class index so the next lookup rescans the source tree"""
+        self._class_index = None
+    
     def _find_class_file(self, class_name: str) -> Optional[str]:
         """Find Java file for a given class name"""
         # Remove generic part if present
-        class_name = re.sub(r'<.*>', '', class_name)
-        
-        # Search in src/main/java
-        pattern = f"**/{class_name}.java"
-        matches = list(self.src_path.rglob(pattern))
+        class_name = _GENERIC_STRIP_RE.sub('', class_name)
         
-        if matches:
-            return str(matches[0])
-        return None
+        self._ensure_index()
+        return self._class_index.get(class_name)
+    
+    def _read_file(self, file_path: str) -> str:
+        """Read a source file through the shared (path, mtime) content cache"""
+        return _read_text_cached(str(file_path), os.stat(file_path).st_mtime_ns)
     
     def get_all_required_mocks(self, graph: Dict[str, ClassDependency], target_class: str) -> Dict[str, Set[str]]:
         """
@@ -183,28 +267,33 @@ class DependencyGraphBuilder:
         for dep in target.dependencies:
             required_mocks[dep] = set()
         
+        # private method -> dependency calls it makes, directly or through other private methods
+        expanded: Dict[str, Set[Tuple[str, str]]] = {}
+        
+        def expand(private_method: str) -> Set[Tuple[str, str]]:
+            if private_method in expanded:
+                # Also hit for a recursive helper still being expanded, which breaks cycles
+                return expanded[private_method]
+            calls = expanded[private_method] = set()
+            for nested_dep, nested_method in target.private_method_calls.get(private_method, ()):
+                if nested_dep == 'this':
+                    calls |= expand(nested_method)
+                else:
+                    calls.add((nested_dep, nested_method))
+            return calls
+        
+        # Calls are made on fields (orderDao), mocks are keyed by type (OrderDao)
+        field_types = {dep[:1].lower() + dep[1:]: dep for dep in target.dependencies}
+        
         # Analyze method calls to know which methods to mock
         for method_name, calls in target.method_calls.items():
-            for call in calls:
-                if '.' in call:
-                    parts = call.split('.')
-                    dep_name = parts[0]
-                    method = parts[1].rstrip('()')
-                    
-                    # Skip 'this' calls (private methods)
-                    if dep_name == 'this':
-                        # Trace into private method
-                        private_method = method.replace('()', '')
-                        if private_method in target.method_calls:
-                            for nested_call in target.method_calls.get(private_method, []):
-                                if '.' in nested_call:
-                                    nested_parts = nested_call.split('.')
-                                    nested_dep = nested_parts[0]
-                                    nested_method = nested_parts[1]
-                                    if nested_dep in required_mocks:
-                                        required_mocks[nested_dep].add(nested_method)
-                    elif dep_name in required_mocks:
-                        required_mocks[dep_name].add(f"{method}()")
+            for dep_name, method in calls:
+                # 'this' calls are private methods: trace into them (expanded once per helper)
+                resolved = expand(method) if dep_name == 'this' else ((dep_name, method),)
+                for call_dep, call_method in resolved:
+                    call_dep = field_types.get(call_dep, call_dep)
+                    if call_dep in required_mocks:
+                        required_mocks[call_dep].add(f"{call_method}()")
         
         return required_mocks
     
@@ -214,7 +303,7 @@ class DependencyGraphBuilder:
         Returns dict of {context_type: file_content}
         """
         graph = self.build_graph_for_class(file_path)
-        target_name = Path(file_path).stem
+        target_name = _class_name(file_path)
         
         if target_name not in graph:
             return {}
@@ -223,20 +312,20 @@ class DependencyGraphBuilder:
         context = {}
         files_added = 0
         
-        # Priority 1: The class itself
-        context['target'] = Path(file_path).read_text(encoding='utf-8')
+        # Priority 1: The class itself (usually already loaded by _analyze_class)
+        context['target'] = target.content if target.content is not None else self._read_file(file_path)
         
         # Priority 2: Entity class (for understanding data model)
-        base_name = target_name.replace('ServiceImpl', '').replace('Service', '').replace('Validator', '').replace('Controller', '')
+        base_name = _SUFFIX_RE.sub('', target_name)
         entity_path = self._find_class_file(f"{base_name}Entity")
         if entity_path and files_added < max_files:
-            context['entity'] = Path(entity_path).read_text(encoding='utf-8')
+            context['entity'] = self._read_file(entity_path)
             files_added += 1
         
         # Priority 3: DTO class
         dto_path = self._find_class_file(base_name)
         if dto_path and files_added < max_files:
-            content = Path(dto_path).read_text(encoding='utf-8')
+            content = self._read_file(dto_path)
             # Only include if it has InDto/OutDto
             if 'InDto' in content or 'OutDto' in content:
                 context['dto'] = content
@@ -245,13 +334,13 @@ class DependencyGraphBuilder:
         # Priority 4: Validator (need to know what exceptions it throws)
         validator_path = self._find_class_file(f"{base_name}Validator")
         if validator_path and validator_path != file_path and files_added < max_files:
-            context['validator'] = Path(validator_path).read_text(encoding='utf-8')
+            context['validator'] = self._read_file(validator_path)
             files_added += 1
         
         # Priority 5: Mapper (need to know mapping methods)
         mapper_path = self._find_class_file(f"{base_name}Mapper")
         if mapper_path and files_added < max_files:
-            context['mapper'] = Path(mapper_path).read_text(encoding='utf-8')
+            context['mapper'] = self._read_file(mapper_path)
             files_added += 1
         
         return context
@@ -0,0 +1,85 @@
+"""
+Diff Patcher - Apply unified diffs returned by the AI to the current test code
+Lets refinements come back as small patches instead of the whole test class
+"""
+import re
+from typing import List, Optional
+
+HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@')
+
+
+def looks_like_diff(response: str) -> bool:
+    """Check whether an AI response contains a unified diff"""
+    return any(HUNK_HEADER_RE.match(line) for line in response.splitlines())
+
+
+def apply_unified_diff(original: str, diff_text: str) -> Optional[str]:
+    """
+    Apply a unified diff to original text
+    Returns the patched text, or None if the diff does not apply cleanly
+    """
+    hunks = _parse_hunks(diff_text)
+    if not hunks:
+        return None
+    
+    lines = original.split('\n')
+    result = []
+    pos = 0  # Next unconsumed line of the original
+    
+    for start, hunk in hunks:
+        old_block = [text for tag, text in hunk if tag in ' -']
+        new_block = [text for tag, text in hunk if tag in ' +']
+        
+        index = _find_block(lines, old_block, max(start - 1, 0), pos)
+        if index is None:
+            return None
+        
+        result.extend(lines[pos:index])
+        result.extend(new_block)
+        pos = index + len(old_block)
+    
+    result.extend(lines[pos:])
+    return '\n'.join(result)
+
+
+def _parse_hunks(diff_text: str) -> List[tuple]:
+    """Parse diff text into [(old_start_line, [(tag, text), ...]), ...]"""
+    hunks = []
+    current = None
+    
+    for line in diff_text.splitlines():
+        header = HUNK_HEADER_RE.match(line)
+        if header:
+            current = []
+            hunks.append((int(header.group(1)), current))
+        elif current is None or line.startswith(('---', '+++', '\\')):
+            continue
+        elif line.startswith('```'):
+            current = None  # End of the fenced diff block
+        elif line[:1] in (' ', '-', '+'):
+            current.append((line[0], line[1:]))
+        elif not line:
+            current.append((' ', ''))  # Some models drop the space on blank context lines
+    
+    for _, hunk in hunks:
+        # A bare blank line after the last hunk is usually just spacing, not context
+        while hunk and hunk[-1] == (' ', ''):
+            hunk.pop()
+    return [(start, hunk) for start, hunk in hunks if hunk]
+
+
+def _find_block(lines: List[str], block: List[str], hint: int, lower: int) -> Optional[int]:
+    """Find block in lines at or after lower, preferring the position closest to hint"""
+    if not block:
+        return max(hint, lower)
+    
+    # Trailing whitespace is not significant; models often drop or add it
+    stripped = [line.rstrip() for line in lines]
+    wanted = [line.rstrip() for line in block]
+    last = len(lines) - len(block)
+    # Line numbers from the model are often off by a few, so search outward from the hint
+    for offset in range(len(lines) + 1):
+        for index in (hint + offset, hint - offset):
+            if lower <= index <= last and stripped[index:index + len(block)] == wanted:
+                return index
+    return None
@@ -1,14 +1,80 @@
 """
 Java Parser - Extract class information from Java source files
 """
+import functools
+import hashlib
+import json
 import re
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+try:
+    from .context_gatherer import _prune_cache_dir, _scandir_java
+except ImportError:  # Run directly as a script
+    from context_gatherer import _prune_cache_dir, _scandir_java
 
+try:
+    import re2  # Optional linear-time engine (google-re2) for the whole-source scans
+    SOURCE_REGEX = re2
+except ImportError:
+    SOURCE_REGEX = re
 
-@dataclass
+PARSER_VERSION = 7  # Bump when parsing changes so cached JavaClass files are ignored
+MAX_BODY_PREVIEW = 800  # Chars of each method body kept for call analysis
+PARALLEL_PARSE_MIN_FILES = 32  # Below this, starting worker processes costs more than it saves
+PARSED_CACHE_MAX_FILES = 2000  # Least recently used parsed classes beyond this are deleted
+
+# Comments and literals, blanked before parsing so their contents cannot match
+_COMMENT_OR_LITERAL_RE = re.compile(r'//[^\n]*|/\*.*?\*/|""".*?"""|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.DOTALL)
+_NOT_NEWLINE_RE = re.compile(r'[^\n]')
+
+# Declaration patterns, compiled once at import; these scan whole files or method bodies
+_PACKAGE_RE = SOURCE_REGEX.compile(r'package\s+([\w.]+);')
+_IMPORT_RE = SOURCE_REGEX.compile(r'import\s+([\w.*]+);')
+_CLASS_RE = SOURCE_REGEX.compile(r'(?:(@\w+(?:\([^)]*\))?)\s*)*(?:public\s+)?(?:(abstract)\s+)?(class|interface)\s+(\w+)(?:\s+extends\s+(\w+))?(?:\s+implements\s+([\w,\s]+))?')
+_ANNOTATION_RE = SOURCE_REGEX.compile(r'@(\w+(?:\([^)]*\))?)')
+# Fields like: OrderDao orderDao; or @Autowired OrderDao orderDao;
+_FIELD_RE = SOURCE_REGEX.compile(r'(?:@\w+\s+)*(?:private|protected|public)?\s*(?:final\s+)?(\w+(?:<[^>]+>)?)\s+(\w+)\s*;')
+# Method declarations (access modifier is optional for interface methods)
+if sys.version_info >= (3, 11):
+    # Possessive quantifiers stop annotation-heavy headers from backtracking; the modifier groups stay
+    # backtrackable because 'public Foo(' must still be able to fall back to type=public (stdlib re only)
+    _METHOD_RE = re.compile(r'((?:@\w++(?:\([^)]*+\))?+\s*+)++)?+(?:(?:public|private|protected)\s++)?(?:(?:static|final|abstract|default)\s++)*(\w++(?:<[^>]++>)?+)\s++(\w++)\s*+\(([^)]*+)\)')
+else:
+    # re before 3.11 has no possessive quantifiers
+    _METHOD_RE = SOURCE_REGEX.compile(r'((?:@\w+(?:\([^)]*\))?\s*)+)?(?:(?:public|private|protected)\s+)?(?:(?:static|final|abstract|default)\s+)*(\w+(?:<[^>]+>)?)\s+(\w+)\s*\(([^)]*)\)')
+_METHOD_ANN_RE = re.compile(r'@(\w+)')
+_BRACE_RE = re.compile(r'[{}]')
+
+# Calls on injected collaborators: fieldName.methodName(...), grouped by the field's suffix
+_CALL_RE = SOURCE_REGEX.compile(r'(\w+(Validator|Service|Dao|Mapper))\.(\w+)\s*\(')
+_CALL_KINDS = {
+    'Validator': 'validator_calls',
+    'Service': 'service_calls',
+    'Dao': 'dao_calls',
+    'Mapper': 'mapper_calls',
+}
+
+# MapStruct helpers
+_USES_RE = re.compile(r'@Mapper\s*\([^)]*uses\s*=\s*\{([^}]+)\}')
+_USES_MAPPER_RE = re.compile(r'(\w+Mapper)\.class')
+# A non-generic type taken whole, or the first <Inner> of a generic type
+_TYPE_RE = re.compile(r'([^<]+)\Z|.*?<(\w+)>', re.DOTALL)
+_SKIP_MAPPER_TYPES = frozenset({'void', 'boolean', 'int', 'long', 'String'})
+_PARAM_ANN_RE = re.compile(r'@\w+\s*')
+_PARAM_TYPE_RE = re.compile(r'([\w<>]+)')
+# Role names stripped anywhere in a class name to get its domain base (OrderServiceImpl -> Order)
+_BASE_SUFFIX_RE = re.compile(r'ServiceImpl|Service|Controller|Mapper')
+_INOUT_DTO_STRIP_RE = re.compile(r'(In|Out)Dto$')
+
+# Slotted dataclasses need Python 3.10; older interpreters get regular ones
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class JavaMethod:
     name: str
     return_type: str
@@ -18,7 +84,7 @@ class JavaMethod:
     body_preview: str = ""
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class JavaClass:
     name: str
     package: str
@@ -36,32 +102,118 @@ class JavaClass:
 class JavaParser:
     """Parse Java source files to extract class information"""
     
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, cache_dir: Optional[str] = None, prune_cache: bool = True):
         self.base_dir = Path(base_dir)
+        # Parsed classes are also saved here as JSON, keyed by content hash, to survive restarts
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir and prune_cache:
+            # Every edit to a file adds an entry; pickles are from versions before the JSON cache
+            _prune_cache_dir(self.cache_dir, PARSED_CACHE_MAX_FILES, '.json', obsolete_suffixes=('.pkl',))
+        # path -> (mtime_ns, size, parsed class); a changed stamp means the file is re-parsed
+        self._mtime_cache: Dict[str, Tuple[int, int, JavaClass]] = {}
     
     def parse_file(self, file_path: str) -> JavaClass:
         """Parse a Java file and extract class information"""
-        path = Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
+        path_str = str(Path(file_path))
+        try:
+            st = os.stat(path_str)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}") from None
+        
+        cached = self._mtime_cache.get(path_str)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        
+        java_class = self._parse_path(path_str)
+        self._mtime_cache[path_str] = (st.st_mtime_ns, st.st_size, java_class)
+        return java_class
+    
+    def parse_files(self, file_paths: List[str]) -> List[JavaClass]:
+        """Parse many Java files, spreading the regex work over worker processes"""
+        if len(file_paths) < PARALLEL_PARSE_MIN_FILES:
+            return [self.parse_file(file_path) for file_path in file_paths]
         
-        with open(path, 'r', encoding='utf-8') as f:
-            source_code = f.read()
+        cache_dir = str(self.cache_dir) if self.cache_dir else None
+        with ProcessPoolExecutor(initializer=_init_parse_worker, initargs=(str(self.base_dir), cache_dir)) as executor:
+            return list(executor.map(_parse_in_worker, file_paths, chunksize=16))
+    
+    def _parse_path(self, file_path: str) -> JavaClass:
+        """Read and parse a Java file, using the on-disk cache when configured"""
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        
+        cache_path = None
+        if self.cache_dir:
+            key = hashlib.sha256(f"{PARSER_VERSION}:".encode() + data).hexdigest()
+            cache_path = self.cache_dir / f"{key}.json"
+            java_class = self._load_cached_class(cache_path)
+            if java_class:
+                java_class.file_path = file_path  # Same content may live at another path
+                return java_class
         
-        return self._parse_source(source_code, str(path))
+        # Same newline handling as reading in text mode
+        source_code = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        java_class = self._parse_source(source_code, file_path)
+        if cache_path:
+            self._save_cached_class(cache_path, java_class)
+        return java_class
+    
+    def _load_cached_class(self, cache_path: Path) -> Optional[JavaClass]:
+        """Load a cached JavaClass from JSON, or None if missing or malformed"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            methods = [JavaMethod(**method) for method in data.pop('methods')]
+            for method in methods:
+                method.return_type = sys.intern(method.return_type)
+                method.name = sys.intern(method.name)
+            java_class = JavaClass(methods=methods, **data)
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+        try:
+            os.utime(cache_path)  # Mark as recently used for _prune_cache_dir
+        except OSError:
+            pass
+        return java_class
+    
+    def _save_cached_class(self, cache_path: Path, java_class: JavaClass):
+        """Atomically save a parsed JavaClass as JSON; the cache is best effort"""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(java_class), f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    
+    @functools.cached_property
+    def _file_index(self) -> Dict[str, str]:
+        """Map of Java file name -> path under base_dir, built with one tree walk"""
+        index = {}
+        for entry in _scandir_java(str(self.base_dir), files_first=True):
+            index.setdefault(entry.name, entry.path)  # First match wins, as with rglob per name
+        return index
+    
+    def invalidate_index(self):
+        """Drop the file index so newly added files are found"""
+        self.__dict__.pop('_file_index', None)
     
     def _parse_source(self, source: str, file_path: str) -> JavaClass:
         """Parse Java source code"""
-        # Extract package
-        package_match = re.search(r'package\s+([\w.]+);', source)
-        package = package_match.group(1) if package_match else ""
+        # Regexes run on a copy with comments and literals blanked out, so offsets match source
+        clean = self._blank_comments_and_literals(source)
         
-        # Extract imports
-        imports = re.findall(r'import\s+([\w.*]+);', source)
+        # Extract package and imports from the statements before the type declaration
+        package, imports = self._scan_header(clean)
+        if not package and not imports:
+            # Unusual layout (e.g. annotated package-info); fall back to searching the whole file
+            package_match = _PACKAGE_RE.search(clean)
+            package = package_match.group(1) if package_match else ""
+            imports = _IMPORT_RE.findall(clean)
         
         # Extract class declaration
-        class_pattern = r'(?:(@\w+(?:\([^)]*\))?)\s*)*(?:public\s+)?(?:(abstract)\s+)?(class|interface)\s+(\w+)(?:\s+extends\s+(\w+))?(?:\s+implements\s+([\w,\s]+))?'
-        class_match = re.search(class_pattern, source)
+        class_match = _CLASS_RE.search(clean)
         
         class_name = class_match.group(4) if class_match else Path(file_path).stem
         extends = class_match.group(5) if class_match and class_match.group(5) else None
@@ -71,14 +223,18 @@ class JavaParser:
         if class_match and class_match.group(2):
             class_type = "abstract"
         
-        # Extract class-level annotations
-        annotations = re.findall(r'@(\w+(?:\([^)]*\))?)', source[:source.find('class ')] if 'class ' in source else source)
+        # Extract class-level annotations, keeping their original text (e.g. string arguments)
+        # Bounded with endpos rather than slicing; _CLASS_RE's match starts before the annotations
+        header_end = clean.find('class ')
+        if header_end == -1:
+            header_end = len(clean)
+        annotations = [source[m.start(1):m.end(1)] for m in _ANNOTATION_RE.finditer(clean, 0, header_end)]
         
         # Extract fields (injected dependencies)
-        fields = self._extract_fields(source)
+        fields = self._extract_fields(clean)
         
         # Extract methods
-        methods = self._extract_methods(source)
+        methods = self._extract_methods(clean)
         
         return JavaClass(
             name=class_name,
@@ -94,25 +250,52 @@ class JavaParser:
             class_type=class_type
         )
     
+    def _scan_header(self, clean: str) -> Tuple[str, List[str]]:
+        """
+        Walk the leading ';'-terminated statements with str.find
+        Returns: (package, imports), stopping at the first statement that is neither
+        """
+        package = ""
+        imports = []
+        pos = 0
+        while True:
+            semi = clean.find(';', pos)
+            if semi == -1:
+                break
+            words = clean[pos:semi].split()
+            pos = semi + 1
+            if len(words) == 2 and words[0] == 'import':
+                imports.append(words[1])
+            elif len(words) == 2 and words[0] == 'package' and not package:
+                package = words[1]
+            elif words and not (len(words) == 3 and words[:2] == ['import', 'static']):
+                break  # Static imports and stray ';' are skipped, anything else is the class body
+        return package, imports
+    
+    def _blank_comments_and_literals(self, source: str) -> str:
+        """Replace comments and string/char literals with spaces, keeping newlines and offsets"""
+        if '/' not in source and '"' not in source and "'" not in source:
+            return source
+        return _COMMENT_OR_LITERAL_RE.sub(lambda m: _NOT_NEWLINE_RE.sub(' ', m.group()), source)
+    
     def _extract_fields(self, source: str) -> List[str]:
         """Extract field declarations"""
         # Match fields like: OrderDao orderDao; or @Autowired OrderDao orderDao;
-        field_pattern = r'(?:@\w+\s+)*(?:private|protected|public)?\s*(?:final\s+)?(\w+(?:<[^>]+>)?)\s+(\w+)\s*;'
-        matches = re.findall(field_pattern, source)
+        matches = _FIELD_RE.findall(source)
         return [f"{type_} {name}" for type_, name in matches]
     
     def _extract_methods(self, source: str) -> List[JavaMethod]:
         """Extract method declarations with body analysis"""
         methods = []
+        # Brace pairs are matched once per file, not once per method
+        brace_pairs = self._match_braces(source)
         
-        # Pattern for method declarations (access modifier is optional for interface methods)
-        method_pattern = r'((?:@\w+(?:\([^)]*\))?\s*)+)?(?:(?:public|private|protected)\s+)?(?:(?:static|final|abstract|default)\s+)*(\w+(?:<[^>]+>)?)\s+(\w+)\s*\(([^)]*)\)'
-        
-        for match in re.finditer(method_pattern, source):
+        for match in _METHOD_RE.finditer(source):
             annotations_str = match.group(1) or ""
-            annotations = re.findall(r'@(\w+)', annotations_str)
-            return_type = match.group(2)
-            method_name = match.group(3)
+            annotations = _METHOD_ANN_RE.findall(annotations_str)
+            # Type and method names repeat across classes; intern them so parsed classes share one copy
+            return_type = sys.intern(match.group(2))
+            method_name = sys.intern(match.group(3))
             params_str = match.group(4)
             
             # Parse parameters
@@ -123,10 +306,11 @@ class JavaParser:
                     if param:
                         params.append(param)
             
-            is_public = 'public' in source[max(0, match.start()-20):match.start()]
+            # Bounded rfind checks the 20 chars before the match without slicing them out
+            is_public = source.rfind('public', max(0, match.start() - 20), match.start()) != -1
             
             # Extract method body for analysis
-            body_preview = self._extract_method_body(source, match.end())
+            body_preview = self._extract_method_body(source, match.end(), brace_pairs)
             
             methods.append(JavaMethod(
                 name=method_name,
@@ -139,25 +323,27 @@ class JavaParser:
         
         return methods
     
-    def _extract_method_body(self, source: str, start_pos: int) -> str:
-        """Extract method body for analysis (up to 500 chars)"""
+    def _match_braces(self, source: str) -> Dict[int, int]:
+        """Map each '{' offset to its matching '}' offset in one pass over the braces"""
+        pairs = {}
+        open_stack = []
+        for match in _BRACE_RE.finditer(source):
+            if match.group() == '{':
+                open_stack.append(match.start())
+            elif open_stack:
+                pairs[open_stack.pop()] = match.start()
+        return pairs
+    
+    def _extract_method_body(self, source: str, start_pos: int, brace_pairs: Dict[int, int]) -> str:
+        """Extract method body for analysis (up to MAX_BODY_PREVIEW chars)"""
         # Find the opening brace
         brace_pos = source.find('{', start_pos)
         if brace_pos == -1:
             return ""
         
-        # Find matching closing brace
-        depth = 1
-        pos = brace_pos + 1
-        while pos < len(source) and depth > 0:
-            if source[pos] == '{':
-                depth += 1
-            elif source[pos] == '}':
-                depth -= 1
-            pos += 1
-        
-        body = source[brace_pos + 1:pos - 1]
-        return body[:800]  # Limit to 800 chars
+        # Unbalanced braces: everything up to the last char
+        end = brace_pairs.get(brace_pos, len(source) - 1)
+        return source[brace_pos + 1:min(end, brace_pos + 1 + MAX_BODY_PREVIEW)]
     
     def extract_method_calls(self, java_class: JavaClass) -> dict:
         """Extract all service/validator/dao method calls from class methods"""
@@ -168,30 +354,13 @@ class JavaParser:
             'mapper_calls': set()
         }
         
-        for method in java_class.methods:
-            body = method.body_preview
-            if not body:
-                continue
-            
-            # Extract validator calls: validatorName.methodName(...)
-            validator_pattern = r'(\w+Validator)\.(\w+)\s*\('
-            for match in re.finditer(validator_pattern, body):
-                calls['validator_calls'].add(f"{match.group(1)}.{match.group(2)}()")
-            
-            # Extract service calls
-            service_pattern = r'(\w+Service)\.(\w+)\s*\('
-            for match in re.finditer(service_pattern, body):
-                calls['service_calls'].add(f"{match.group(1)}.{match.group(2)}()")
-            
-            # Extract dao calls
-            dao_pattern = r'(\w+Dao)\.(\w+)\s*\('
-            for match in re.finditer(dao_pattern, body):
-                calls['dao_calls'].add(f"{match.group(1)}.{match.group(2)}()")
-            
-            # Extract mapper calls
-            mapper_pattern = r'(\w+Mapper)\.(\w+)\s*\('
-            for match in re.finditer(mapper_pattern, body):
-                calls['mapper_calls'].add(f"{match.group(1)}.{match.group(2)}()")
+        # All bodies are scanned in one pass; ';' between them keeps a match from spanning two bodies
+        bodies = '\n;\n'.join(method.body_preview for method in java_class.methods if method.body_preview)
+        # Cheap substring probe: most classes never mention a collaborator suffix, so skip the regex
+        if not any(kind in bodies for kind in _CALL_KINDS):
+            return {k: [] for k in calls}
+        for match in _CALL_RE.finditer(bodies):
+            calls[_CALL_KINDS[match.group(2)]].add(sys.intern(f"{match.group(1)}.{match.group(3)}()"))
         
         return {k: list(v) for k, v in calls.items()}
     
@@ -205,42 +374,31 @@ class JavaParser:
         Returns a set of type names to find.
         """
         types = set()
+        # Signature types are slices of the source, so without these substrings nothing can match
+        if 'Dto' not in java_class.source_code and 'Entity' not in java_class.source_code:
+            return types
         
         for method in java_class.methods:
-            # Extract return type
-            return_type = method.return_type
-            if return_type and return_type not in ('void', 'boolean', 'int', 'long', 'String'):
-                # Handle generics: List<TypeName> -> TypeName
-                if '<' in return_type:
-                    inner_type = re.search(r'<(\w+)>', return_type)
-                    if inner_type:
-                        types.add(inner_type.group(1))
-                else:
-                    types.add(return_type)
-            
-            # Extract parameter types
+            type_strs = [method.return_type]
             for param in method.parameters:
-                # Remove annotations like @MappingTarget
-                param_clean = re.sub(r'@\w+\s*', '', param).strip()
-                # Extract type name (first word, handling generics)
-                type_match = re.match(r'([\w<>]+)', param_clean)
+                # Remove annotations like @MappingTarget, then take the type (first word, with generics)
+                type_match = _PARAM_TYPE_RE.match(_PARAM_ANN_RE.sub('', param).strip())
                 if type_match:
-                    param_type = type_match.group(1)
-                    if param_type not in ('void', 'boolean', 'int', 'long', 'String'):
-                        if '<' in param_type:
-                            inner_type = re.search(r'<(\w+)>', param_type)
-                            if inner_type:
-                                types.add(inner_type.group(1))
-                        else:
-                            types.add(param_type)
-        
-        # Filter to only DTO/Entity patterns (ends with InDto, OutDto, Entity, or starts with uppercase)
-        filtered_types = set()
-        for t in types:
-            if t.endswith('InDto') or t.endswith('OutDto') or t.endswith('Entity') or t.endswith('Dto'):
-                filtered_types.add(t)
+                    type_strs.append(type_match.group(1))
+            
+            for type_str in type_strs:
+                if not type_str or type_str in _SKIP_MAPPER_TYPES:
+                    continue
+                # One match yields the bare type or, for generics, the inner type: List<TypeName> -> TypeName
+                type_match = _TYPE_RE.match(type_str)
+                if not type_match:
+                    continue
+                type_name = type_match.group(1) or type_match.group(2)
+                # Only DTO/Entity types have files worth finding
+                if type_name.endswith(('Dto', 'Entity')):
+                    types.add(type_name)
         
-        return filtered_types
+        return types
     
     def extract_uses_mappers(self, java_class: JavaClass) -> list:
         """Extract dependent mappers from @Mapper(uses = {...}) annotation.
@@ -251,16 +409,18 @@ class JavaParser:
         Returns a list of mapper class names.
         """
         mappers = []
+        source = java_class.source_code
+        # Both literals are required by the pattern; probe for them before running it
+        if '@Mapper' not in source or 'uses' not in source:
+            return mappers
         
         # Search in source code for @Mapper annotation with uses
-        uses_pattern = r'@Mapper\s*\([^)]*uses\s*=\s*\{([^}]+)\}'
-        match = re.search(uses_pattern, java_class.source_code)
+        match = _USES_RE.search(source)
         
         if match:
             uses_content = match.group(1)
             # Extract individual mapper classes: XxxMapper.class -> XxxMapper
-            mapper_pattern = r'(\w+Mapper)\.class'
-            for mapper_match in re.finditer(mapper_pattern, uses_content):
+            for mapper_match in _USES_MAPPER_RE.finditer(uses_content):
                 mappers.append(mapper_match.group(1))
         
         return mappers
@@ -268,7 +428,9 @@ class JavaParser:
     def find_related_files(self, java_class: JavaClass) -> dict:
         """Find related files (Entity, DTO, Mapper, etc.)"""
         related = {}
-        base_name = java_class.name.replace("ServiceImpl", "").replace("Service", "").replace("Controller", "").replace("Mapper", "")
+        # Built once per parser; every lookup below is a dict hit instead of a tree walk
+        file_index = self._file_index
+        base_name = _BASE_SUFFIX_RE.sub('', java_class.name)
         
         # Check if this is a Mapper class
         is_mapper = java_class.name.endswith('Mapper') or any('Mapper' in ann for ann in java_class.annotations)
@@ -285,9 +447,9 @@ class JavaParser:
         }
         
         for key, pattern in patterns.items():
-            found = list(self.base_dir.rglob(pattern))
+            found = file_index.get(pattern)
             if found:
-                related[key] = str(found[0])
+                related[key] = found
         
         # For Mapper classes, also find all types referenced in method signatures
         if is_mapper:
@@ -302,34 +464,48 @@ class JavaParser:
                 container_name = None
                 if type_name.endswith('InDto') or type_name.endswith('OutDto'):
                     # Extract base: BillingAddressInDto -> BillingAddress
-                    container_name = re.sub(r'(In|Out)Dto$', '', type_name)
+                    container_name = _INOUT_DTO_STRIP_RE.sub('', type_name)
                 
                 # Try to find the file
                 if type_name.endswith('Entity'):
-                    found = list(self.base_dir.rglob(f"{type_name}.java"))
+                    found = file_index.get(f"{type_name}.java")
                     if found:
-                        related[f'mapper_entity_{type_name}'] = str(found[0])
+                        related[f'mapper_entity_{type_name}'] = found
                 elif container_name:
                     # Look for container file (e.g., BillingAddress.java for BillingAddressInDto)
-                    found = list(self.base_dir.rglob(f"{container_name}.java"))
+                    found = file_index.get(f"{container_name}.java")
                     if found:
-                        related[f'mapper_dto_{container_name}'] = str(found[0])
+                        related[f'mapper_dto_{container_name}'] = found
                 else:
                     # Direct search for the type
-                    found = list(self.base_dir.rglob(f"{type_name}.java"))
+                    found = file_index.get(f"{type_name}.java")
                     if found:
-                        related[f'mapper_type_{type_name}'] = str(found[0])
+                        related[f'mapper_type_{type_name}'] = found
             
             # Also include dependent mappers from @Mapper(uses = {...})
             uses_mappers = self.extract_uses_mappers(java_class)
             for mapper_name in uses_mappers:
-                found = list(self.base_dir.rglob(f"{mapper_name}.java"))
+                found = file_index.get(f"{mapper_name}.java")
                 if found:
-                    related[f'uses_mapper_{mapper_name}'] = str(found[0])
+                    related[f'uses_mapper_{mapper_name}'] = found
         
         return related
 
 
+_worker_parser: Optional[JavaParser] = None
+
+
+def _init_parse_worker(base_dir: str, cache_dir: Optional[str]):
+    """Create the per-process parser used by parse_files"""
+    global _worker_parser
+    _worker_parser = JavaParser(base_dir, cache_dir=cache_dir, prune_cache=False)  # Pruned by the parent
+
+
+def _parse_in_worker(file_path: str) -> JavaClass:
+    """Parse one file in a worker process"""
+    return _worker_parser.parse_file(file_path)
+
+
 if __name__ == "__main__":
     # Test the parser
     parser = JavaParser("src/main/java")
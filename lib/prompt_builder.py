@@ -1,34 +1,26 @@
 """
 Prompt Builder - Create context-aware prompts for test generation
 """
+import functools
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from .java_parser import JavaClass
 from .context_gatherer import ContextGatherer
 
+# Section markers used to split a combined unit + integration response
+UNIT_TEST_MARKER = "=== UNIT TEST ==="
+INTEGRATION_TEST_MARKER = "=== INTEGRATION TEST ==="
 
-class PromptBuilder:
-    """Build prompts for AI test generation"""
-    
-    def __init__(self, context_gatherer: ContextGatherer):
-        self.context = context_gatherer
-    
-    def build_system_prompt(self) -> str:
-        """Build the system prompt with project context"""
-        return f"""You are an expert Java developer specializing in Spring Boot testing.
-You write high-quality, maintainable test code following modern best practices.
+# Type names that look like enums (e.g. ApiKeyType, OrderStatus, ProcessState, DeliveryMode)
+_ENUM_SUFFIXES = ('Type', 'Status', 'State', 'Mode', 'Category', 'Enum')
+_WORD_RE = re.compile(r'\w+')
 
-## PROJECT CONTEXT
-
-This is a B2B procurement platform called "Cathago Earth". Here are the key conventions:
-
-### Project Structure (scanned at startup):
-{self.context.get_project_summary()[:3000]}
-
-### Coding Conventions (from architecture.md):
-{self.context.get_architecture_summary()[:2000]}
-
-### Entity Relationships & Sample Data (from metadata.txt):
-{self.context.get_metadata_summary()[:2000]}
+# Instructions that never change; sent ahead of the project context so the model
+# provider can reuse its cached prefix across sessions
+_STATIC_SYSTEM_PREFIX = """You are an expert Java developer specializing in Spring Boot testing.
+You write high-quality, maintainable test code following modern best practices.
 
 ## TESTING STANDARDS
 
@@ -48,7 +40,7 @@ Always follow these practices:
    
 2. **For generic types with Instancio, use TypeToken:**
    - WRONG: `SearchOutDto<ProjectOutDto> dto = Instancio.create(SearchOutDto.class);`
-   - CORRECT: `SearchOutDto<ProjectOutDto> dto = Instancio.create(new TypeToken<SearchOutDto<ProjectOutDto>>() {{}});`
+   - CORRECT: `SearchOutDto<ProjectOutDto> dto = Instancio.create(new TypeToken<SearchOutDto<ProjectOutDto>>() {});`
    
 3. **Set non-null nested entities when testing methods with internal logic:**
    ```java
@@ -115,48 +107,32 @@ import static org.instancio.Select.field;
 ```
 """
 
-    def build_unit_test_prompt(self, java_class: JavaClass, related_content: dict, method_calls: dict = None) -> str:
-        """Build prompt for unit test generation"""
-        related_code = self._format_related_content(related_content)
-        
-        # Format method calls that need mocking
-        mock_requirements = ""
-        if method_calls:
-            mock_requirements = "\n## METHODS THAT MUST BE MOCKED (extracted from method bodies):\n"
-            if method_calls.get('validator_calls'):
-                mock_requirements += f"\n### Validator calls:\n"
-                for call in method_calls['validator_calls'][:10]:
-                    mock_requirements += f"- {call}\n"
-            if method_calls.get('service_calls'):
-                mock_requirements += f"\n### Service calls:\n"
-                for call in method_calls['service_calls'][:10]:
-                    mock_requirements += f"- {call}\n"
-            if method_calls.get('dao_calls'):
-                mock_requirements += f"\n### DAO calls:\n"
-                for call in method_calls['dao_calls'][:10]:
-                    mock_requirements += f"- {call}\n"
-            if method_calls.get('mapper_calls'):
-                mock_requirements += f"\n### Mapper calls:\n"
-                for call in method_calls['mapper_calls'][:10]:
-                    mock_requirements += f"- {call}\n"
-        
-        # Extract enums used in this specific class
-        enum_context = self._extract_class_specific_enums(java_class.source_code)
-        if enum_context:
-            mock_requirements += f"\n## ENUMS USED IN THIS CLASS (use ONLY these values):\n{enum_context}\n"
-        
-        return f"""Generate a comprehensive unit test for the following Spring Boot service class.
+
+# method_calls key -> heading in the mock requirements section, in prompt order
+_MOCK_CALL_SECTIONS = (
+    ('validator_calls', 'Validator calls'),
+    ('service_calls', 'Service calls'),
+    ('dao_calls', 'DAO calls'),
+    ('mapper_calls', 'Mapper calls'),
+)
+
+# Prompt bodies, built once at import; only the ${...} slots are filled per call.
+# Static rules come first and the target class comes last, so prompts for
+# different classes share the longest possible byte prefix.
+_UNIT_TEST_PROMPT = string.Template("""Generate a comprehensive unit test for the Spring Boot service class given under TARGET CLASS TO TEST below.
+
+${requirements}
+## RELATED CLASSES (for context):
+${related}
 
 ## TARGET CLASS TO TEST:
 ```java
-{java_class.source_code}
+${source}
 ```
+${mocks}
+Name the test class `${name}Test`. Generate the complete test class with all imports.""")
 
-## RELATED CLASSES (for context):
-{related_code}
-{mock_requirements}
-
-## CRITICAL REQUIREMENTS (follow exactly to avoid test failures):
+_UNIT_TEST_REQUIREMENTS = """## CRITICAL REQUIREMENTS (follow exactly to avoid test failures):
 
 ### 0. CRITICAL: NEVER RECREATE EXISTING PROJECT CLASSES
 DO NOT create inner classes or local copies of project classes in the test file!
@@ -175,9 +151,9 @@ The test file should ONLY contain:
 WRONG - DO NOT DO THIS:
 ```java
 // DON'T recreate classes that exist in the project
-class BaseEntity {{ ... }}  // WRONG!
-enum ApiKeyType {{ ... }}    // WRONG!
-class ApiKeyEntity {{ ... }} // WRONG!
+class BaseEntity { ... }  // WRONG!
+enum ApiKeyType { ... }    // WRONG!
+class ApiKeyEntity { ... } // WRONG!
 ```
 
 CORRECT - Always import:
@@ -188,7 +164,7 @@ import de.cathago.earth.domain.core.common.entity.BaseEntity;
 ```
 
 ### 1. Test Class Structure
-- Create a test class named `{java_class.name}Test`
+- Create a test class named after the target class with a `Test` suffix
 - Use `@ExtendWith(MockitoExtension.class)` on the class
 - DO NOT use @Nested inner classes - put ALL test methods directly in the test class
 - Include `@DisplayName` with clear descriptions (format: "methodName - should do X when Y")
@@ -220,13 +196,13 @@ private SomeMapper mapper = Mappers.getMapper(SomeMapper.class);  // Real object
 when(mapper.method()).thenReturn(x);  // WRONG! Can't use when() on real objects!
 ```
 
-### 1d. Mappers with @Mapper(uses = {{...}}) - Dependent Mappers
-When a Mapper has `uses = {{OtherMapper.class, ...}}`, MapStruct generates an implementation that automatically includes all dependent mappers. You do NOT need to mock or manually wire these.
+### 1d. Mappers with @Mapper(uses = {...}) - Dependent Mappers
+When a Mapper has `uses = {OtherMapper.class, ...}`, MapStruct generates an implementation that automatically includes all dependent mappers. You do NOT need to mock or manually wire these.
 
 ```java
 // CatalogMapper uses CatalogHasTenantMapper, SupplierAccountMapper, CompanyAccountMapper
-@Mapper(componentModel = "spring", uses = {{CatalogHasTenantMapper.class, SupplierAccountMapper.class}})
-public interface CatalogMapper {{ ... }}
+@Mapper(componentModel = "spring", uses = {CatalogHasTenantMapper.class, SupplierAccountMapper.class})
+public interface CatalogMapper { ... }
 
 // In test: Just use getMapper - dependent mappers are auto-included
 private CatalogMapper catalogMapper = Mappers.getMapper(CatalogMapper.class);
@@ -241,14 +217,14 @@ Many methods call private helper methods that access nested entity fields. Confi
 
 ```java
 @BeforeEach
-void setUp() {{
+void setUp() {
     // Create entities with ALL nested objects populated (no nulls)
     entity = Instancio.of(EntityClass.class)
         .withSettings(Settings.create()
             .set(Keys.SET_BACK_REFERENCES, false)
             .set(Keys.MAX_DEPTH, 4))
         .create();
-}}
+}
 ```
 
 ### 2b. CRITICAL: Instancio.withSettings() is NOT a standalone method!
@@ -302,9 +278,9 @@ lenient().when(service.method(any())).thenReturn(result);
 MockedStatic requires mockito-inline which is NOT available:
 ```java
 // WRONG - will fail with "SubclassByteBuddyMockMaker does not support static mocks"
-try (MockedStatic<SomeUtil> mockedStatic = mockStatic(SomeUtil.class)) {{
+try (MockedStatic<SomeUtil> mockedStatic = mockStatic(SomeUtil.class)) {
     mockedStatic.when(SomeUtil::createToken).thenReturn("token");
-}}
+}
 
 // CORRECT - just use the real static method or bypass it:
 // Option 1: Don't mock static methods at all, let them run
@@ -342,7 +318,7 @@ lenient().when(optionalService.method(any())).thenReturn(result);
 ```java
 @Test
 @DisplayName("should do X when Y")
-void shouldDoXWhenY() {{
+void shouldDoXWhenY() {
     // Given
     when(dependency.method(any())).thenReturn(expectedValue);
     
@@ -352,7 +328,7 @@ void shouldDoXWhenY() {{
     // Then
     assertThat(result).isEqualTo(expectedValue);
     verify(dependency).method(any());
-}}
+}
 ```
 
 ### 8. Required Imports
@@ -364,102 +340,95 @@ import org.instancio.Instancio;
 import org.instancio.settings.Keys;
 import org.instancio.settings.Settings;
 ```
+"""
 
-Generate the complete test class with all imports."""
 
-    def build_integration_test_prompt(self, java_class: JavaClass, related_content: dict) -> str:
-        """Build prompt for E2E integration test generation"""
-        related_code = self._format_related_content(related_content)
-        sample_data = self.context.get_sample_test_data(
-            java_class.name.replace("Controller", "").replace("ServiceImpl", "")
-        )
-        
-        # Extract domain name from package
-        domain_name = java_class.package.split('.')[-2] if java_class.package else "domain"
-        
-        return f"""Generate a complete end-to-end integration test for the following Spring Boot controller.
+_INTEGRATION_TEST_PROMPT = string.Template("""Generate a complete end-to-end integration test for the Spring Boot controller given under TARGET CLASS TO TEST below.
+
+${requirements}
+## SAMPLE DATA FOR TESTS (use realistic values):
+${sample_data}
+
+## RELATED CLASSES (for context):
+${related}
 
 ## TARGET CLASS TO TEST:
 ```java
-{java_class.source_code}
+${source}
 ```
 
-## RELATED CLASSES (for context):
-{related_code}
+Generate the complete test class with all imports.""")
 
-## SAMPLE DATA FOR TESTS (use realistic values):
-{sample_data}
-
-## CRITICAL: Follow the EXACT project patterns below
+_INTEGRATION_TEST_REQUIREMENTS = string.Template("""## CRITICAL: Follow the EXACT project patterns below
 
 ### 1. Test Class Structure
 ```java
 @Slf4j
-class {java_class.name.replace('Controller', 'IntegrationTest').replace('Procurement', '').replace('Supplier', '')} extends BaseEarthApplicationIntegrationTest {{
+class ${test_class} extends BaseEarthApplicationIntegrationTest {
 
-    private static final String API_ENDPOINT = "/api/gateways/procurement/{domain_name.lower()}s";
+    private static final String API_ENDPOINT = "/api/gateways/procurement/${domain_lower}s";
     private static final String COMPANY_ACCOUNT_ID = "test_a_ca_1";
 
-    @Value("classpath:dtos/{domain_name.lower()}/GET_{domain_name}OutDto.json")
-    Resource GET_{domain_name}OutDtoJson;
+    @Value("classpath:dtos/${domain_lower}/GET_${domain}OutDto.json")
+    Resource GET_${domain}OutDtoJson;
 
-    @Value("classpath:dtos/{domain_name.lower()}/POST_{domain_name}InDto.json")  
-    Resource POST_{domain_name}InDtoJson;
+    @Value("classpath:dtos/${domain_lower}/POST_${domain}InDto.json")  
+    Resource POST_${domain}InDtoJson;
 
     @Autowired
     private ProcurementUserContext procurementUserContext;
 
     @Test
     @Order(1)
-    void findAll() throws Exception {{
+    void findAll() throws Exception {
         ResultActions resultActions = mockMvc.perform(MockMvcRequestBuilders.get(API_ENDPOINT)
                 .contentType(MediaType.APPLICATION_JSON)
                 .header("Authorization", procurementUserContext.getToken())
                 .param("companyAccountId", COMPANY_ACCOUNT_ID))
             .andExpect(status().isOk())
             .andDo(result -> printIfFailed(result, HttpStatus.OK));
-        assertResponse(resultActions, GET_{domain_name}OutDtosJson);
-    }}
+        assertResponse(resultActions, GET_${domain}OutDtosJson);
+    }
 
     @Test
     @Order(2)  
-    void find() throws Exception {{
+    void find() throws Exception {
         ResultActions resultActions = mockMvc.perform(MockMvcRequestBuilders.get(API_ENDPOINT + "/" + ENTITY_ID)
                 .contentType(MediaType.APPLICATION_JSON)
                 .header("Authorization", procurementUserContext.getToken())
                 .param("companyAccountId", COMPANY_ACCOUNT_ID))
             .andExpect(status().isOk());
-        assertResponse(resultActions, GET_{domain_name}OutDtoJson);
-    }}
+        assertResponse(resultActions, GET_${domain}OutDtoJson);
+    }
 
     @Test
     @Order(3)
-    void create() throws Exception {{
+    void create() throws Exception {
         ResultActions resultActions = mockMvc.perform(MockMvcRequestBuilders.post(API_ENDPOINT)
                 .contentType(MediaType.APPLICATION_JSON)
                 .header("Authorization", procurementUserContext.getToken())
                 .param("companyAccountId", COMPANY_ACCOUNT_ID)
-                .content(basicJsonTester.from(POST_{domain_name}InDtoJson).getJson()))
+                .content(basicJsonTester.from(POST_${domain}InDtoJson).getJson()))
             .andExpect(status().isCreated());
-        assertResponse(resultActions, POST_{domain_name}OutDtoJson);
-    }}
+        assertResponse(resultActions, POST_${domain}OutDtoJson);
+    }
 
     @Test
     @Order(4)
-    void delete() throws Exception {{
+    void delete() throws Exception {
         mockMvc.perform(MockMvcRequestBuilders.delete(API_ENDPOINT + "/" + ENTITY_ID)
                 .contentType(MediaType.APPLICATION_JSON)
                 .header("Authorization", procurementUserContext.getToken())
                 .param("companyAccountId", COMPANY_ACCOUNT_ID))
             .andExpect(status().isNoContent());
-    }}
-}}
+    }
+}
 ```
 
 ### 2. REQUIREMENTS:
 1. Extend `BaseEarthApplicationIntegrationTest` (NOT AbstractIntegrationTest)
 2. Use `@Order` annotation for test execution sequence (find → create → update → delete)
-3. Use `@Value("classpath:dtos/{{domain}}/{{file}}.json")` for expected JSON responses
+3. Use `@Value("classpath:dtos/{domain}/{file}.json")` for expected JSON responses
 4. Use `procurementUserContext.getToken()` for Authorization header
 5. Always pass `companyAccountId` as request parameter
 6. Use `assertResponse(resultActions, resourceJson)` for JSON comparison
@@ -488,85 +457,284 @@ import static org.springframework.test.web.servlet.result.MockMvcResultMatchers.
 ### 4. IMPORTANT:
 - The test data already exists in SQL migration scripts (e.g., M003__create_project.sql)
 - Use existing entity IDs from those scripts (project1, project2, 12uu21, etc.)
-- Expected JSON files should be created in src/test/resources/dtos/{{domain}}/
+- Expected JSON files should be created in src/test/resources/dtos/{domain}/
+""")
 
-Generate the complete test class with all imports."""
+_COMBINED_TEST_PROMPT = string.Template("""Generate BOTH a comprehensive unit test AND a complete end-to-end integration test for the Spring Boot class given under TARGET CLASS TO TEST below.
 
-    def build_refinement_prompt(self, current_code: str, user_feedback: str) -> str:
-        """Build prompt for refining/modifying generated tests"""
-        return f"""The user wants to modify the following test code.
+# PART 1: UNIT TEST
+
+${unit_requirements}
+# PART 2: INTEGRATION TEST
+
+${integration_requirements}
+## SAMPLE DATA FOR INTEGRATION TESTS (use realistic values):
+${sample_data}
+
+## RELATED CLASSES (for context):
+${related}
+
+## TARGET CLASS TO TEST:
+```java
+${source}
+```
+${mocks}
+Name the unit test class `${name}Test`.
+
+## OUTPUT FORMAT (follow exactly):
+Output both complete test classes with all imports, each preceded by its marker on its own line:
+
+${unit_marker}
+<unit test class>
+${integration_marker}
+<integration test class>""")
+
+_REFINEMENT_PROMPT = string.Template("""The user wants to modify the following test code.
 
 ## CURRENT TEST CODE:
 ```java
-{current_code}
+${current_code}
 ```
 
 ## USER'S REQUESTED CHANGES:
-{user_feedback}
+${user_feedback}
 
 ## INSTRUCTIONS:
 1. Apply the requested changes
 2. Keep all existing good patterns
 3. Maintain BDD style and naming conventions
-4. Output the complete modified test class
+4. Output ONLY a unified diff against the CURRENT TEST CODE above, in a ```diff block
+5. Use `@@ -start,count +start,count @@` hunk headers with 3 lines of unchanged context
+6. Copy context and removed lines exactly as they appear in the current code
+
+Generate the diff.""")
 
-Generate the updated test class."""
+
+class PromptBuilder:
+    """Build prompts for AI test generation"""
+    
+    def __init__(self, context_gatherer: ContextGatherer):
+        self.context = context_gatherer
+        # Assembled system prompts keyed by the three context summaries they embed
+        self._system_prompt_cached = functools.lru_cache(maxsize=4)(self._assemble_system_prompt)
+        # Project enums and their partial-match index, tied to the context scan they came from
+        self._enums_source = None
+        self._project_enums = {}
+        self._enum_index = None
+    
+    def build_system_prompt(self) -> str:
+        """Build the system prompt: static instructions first, project context last"""
+        # architecture.md and metadata.txt are read from disk on first use; load them
+        # in the background while the project summary is built from the scan cache
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            architecture_summary = pool.submit(self.context.get_architecture_summary_truncated, 2000)
+            metadata_summary = pool.submit(self.context.get_metadata_summary_truncated, 2000)
+            project_summary = self.context.get_project_summary_truncated(3000)
+            
+            return self._system_prompt_cached(
+                project_summary,
+                architecture_summary.result(),
+                metadata_summary.result()
+            )
+    
+    def _assemble_system_prompt(self, project_summary: str, architecture_summary: str, metadata_summary: str) -> str:
+        """Join the static prefix with the project context section"""
+        return _STATIC_SYSTEM_PREFIX + f"""
+## PROJECT CONTEXT
+
+This is a B2B procurement platform called "Cathago Earth". Here are the key conventions:
+
+### Project Structure (scanned at startup):
+{project_summary}
+
+### Coding Conventions (from architecture.md):
+{architecture_summary}
+
+### Entity Relationships & Sample Data (from metadata.txt):
+{metadata_summary}
+"""
+
+    def build_unit_test_prompt(self, java_class: JavaClass, related_content: dict, method_calls: dict = None) -> str:
+        """Build prompt for unit test generation"""
+        related_code = self._format_related_content(related_content)
+        mock_requirements = self._format_mock_requirements(java_class, method_calls)
+        
+        return _UNIT_TEST_PROMPT.substitute(
+            source=java_class.source_code,
+            related=related_code,
+            mocks=mock_requirements,
+            name=java_class.name,
+            requirements=_UNIT_TEST_REQUIREMENTS
+        )
+    
+    def _format_mock_requirements(self, java_class: JavaClass, method_calls: dict = None) -> str:
+        """
+        Format the calls that need mocking and the enums used by the class
+        Calls and enums are sorted so the same class always yields the same prompt bytes
+        """
+        # Format method calls that need mocking
+        parts = []
+        if method_calls:
+            parts.append("\n## METHODS THAT MUST BE MOCKED (extracted from method bodies):\n")
+            for key, heading in _MOCK_CALL_SECTIONS:
+                calls = method_calls.get(key)
+                if calls:
+                    parts.append(f"\n### {heading}:\n")
+                    parts.extend(f"- {call}\n" for call in sorted(calls)[:10])
+        
+        # Extract enums used in this specific class
+        enum_context = self._extract_class_specific_enums(java_class.source_code)
+        if enum_context:
+            parts.append(f"\n## ENUMS USED IN THIS CLASS (use ONLY these values):\n{enum_context}\n")
+        
+        return ''.join(parts)
+
+    def build_integration_test_prompt(self, java_class: JavaClass, related_content: dict) -> str:
+        """Build prompt for E2E integration test generation"""
+        related_code = self._format_related_content(related_content)
+        sample_data = self.context.get_sample_test_data(
+            java_class.name.replace("Controller", "").replace("ServiceImpl", "")
+        )
+        
+        return _INTEGRATION_TEST_PROMPT.substitute(
+            source=java_class.source_code,
+            related=related_code,
+            sample_data=sample_data,
+            requirements=self._integration_test_requirements(java_class)
+        )
+
+    def _integration_test_requirements(self, java_class: JavaClass) -> str:
+        """Integration test rules shared by the integration and combined prompts"""
+        # Extract domain name from package
+        domain_name = java_class.package.split('.')[-2] if java_class.package else "domain"
+        
+        return _INTEGRATION_TEST_REQUIREMENTS.substitute(
+            test_class=java_class.name.replace('Controller', 'IntegrationTest').replace('Procurement', '').replace('Supplier', ''),
+            domain=domain_name,
+            domain_lower=domain_name.lower()
+        )
+
+    def build_combined_prompt(self, java_class: JavaClass, related_content: dict, method_calls: dict = None) -> str:
+        """Build one prompt asking for both the unit and the integration test.
+        
+        The response contains UNIT_TEST_MARKER followed by the unit test and
+        INTEGRATION_TEST_MARKER followed by the integration test.
+        """
+        related_code = self._format_related_content(related_content)
+        mock_requirements = self._format_mock_requirements(java_class, method_calls)
+        sample_data = self.context.get_sample_test_data(
+            java_class.name.replace("Controller", "").replace("ServiceImpl", "")
+        )
+        
+        return _COMBINED_TEST_PROMPT.substitute(
+            source=java_class.source_code,
+            related=related_code,
+            mocks=mock_requirements,
+            sample_data=sample_data,
+            name=java_class.name,
+            unit_requirements=_UNIT_TEST_REQUIREMENTS,
+            integration_requirements=self._integration_test_requirements(java_class),
+            unit_marker=UNIT_TEST_MARKER,
+            integration_marker=INTEGRATION_TEST_MARKER
+        )
+
+    def build_refinement_prompt(self, current_code: str, user_feedback: str) -> str:
+        """Build prompt for refining/modifying generated tests"""
+        return _REFINEMENT_PROMPT.substitute(current_code=current_code, user_feedback=user_feedback)
+
+    def build_full_test_request(self) -> str:
+        """Build follow-up prompt asking for the whole test class when a diff could not be applied"""
+        return """Your diff could not be applied to the current test code.
+Output the complete modified test class instead, with the requested changes applied."""
 
     def _format_related_content(self, related_content: dict) -> str:
-        """Format related files content for prompt"""
+        """Format related files content for prompt, sorted by key for a stable prompt prefix"""
         if not related_content:
             return "No related files found."
         
-        parts = []
-        for key, data in related_content.items():
-            # Limit each file to prevent token overflow
-            content = data['content'][:3000] if len(data['content']) > 3000 else data['content']
-            parts.append(f"### {key.upper()} ({data['path']}):\n```java\n{content}\n```")
+        # Each file is limited to prevent token overflow (truncated when it was loaded)
+        return '\n\n'.join(
+            f"### {key.upper()} ({data['path']}):\n```java\n{data['prompt_content']}\n```"
+            for key, data in sorted(related_content.items())
+        )
+    
+    def _get_project_enums(self) -> dict:
+        """Project enums from the context scan, re-read only when the context is rebuilt"""
+        scan = self.context.project_context_cache
+        if scan is not self._enums_source:
+            self._enums_source = scan
+            self._project_enums = scan.get('enums', {}) if scan else {}
+            self._enum_index = None
+        return self._project_enums
+    
+    def _build_enum_index(self) -> tuple:
+        """
+        Index project enums that have values for partial name lookups
+        Returns: (values by position, position by name, position by enum-like substring)
+        """
+        values_list, by_name, by_substring = [], {}, {}
+        for name, info in self._get_project_enums().items():
+            values = info.get('values', [])
+            if not values:
+                continue
+            position = len(values_list)
+            values_list.append(', '.join(values))
+            by_name.setdefault(name, position)
+            # Names searched for always end in an enum suffix, so only those substrings are indexed
+            for suffix in _ENUM_SUFFIXES:
+                suffix_pos = name.find(suffix)
+                while suffix_pos != -1:
+                    end = suffix_pos + len(suffix)
+                    for start in range(suffix_pos):
+                        by_substring.setdefault(name[start:end], position)
+                    suffix_pos = name.find(suffix, suffix_pos + 1)
+        return values_list, by_name, by_substring
+    
+    def _find_partial_enum(self, enum_name: str) -> Optional[str]:
+        """Values of the first enum whose name contains enum_name or is contained in it"""
+        if self._enum_index is None:
+            self._enum_index = self._build_enum_index()
+        values_list, by_name, by_substring = self._enum_index
         
-        return '\n\n'.join(parts)
+        best = by_substring.get(enum_name, len(values_list))
+        for start in range(len(enum_name)):
+            for end in range(start + 1, len(enum_name) + 1):
+                position = by_name.get(enum_name[start:end])
+                if position is not None and position < best:
+                    best = position
+        return values_list[best] if best < len(values_list) else None
     
     def _extract_class_specific_enums(self, source_code: str) -> str:
         """Extract enums used in this class and get their valid values from project context"""
-        import re
-        
-        # Find enum types used in the source code (patterns like XxxType, XxxStatus)
-        enum_patterns = [
-            r'\b(\w+Type)\b',          # e.g., ApiKeyType
-            r'\b(\w+Status)\b',        # e.g., OrderStatus
-            r'\b(\w+State)\b',         # e.g., ProcessState
-            r'\b(\w+Mode)\b',          # e.g., DeliveryMode
-            r'\b(\w+Category)\b',      # e.g., ProductCategory
-            r'\b(\w+Enum)\b',          # e.g., SomeEnum
-        ]
-        
-        found_enums = set()
-        for pattern in enum_patterns:
-            matches = re.findall(pattern, source_code)
-            found_enums.update(matches)
+        # Find enum types used in the source code (patterns like XxxType, XxxStatus):
+        # whole words ending in a suffix, but not the bare suffix itself
+        found_enums = {
+            word for word in set(_WORD_RE.findall(source_code))
+            if word.endswith(_ENUM_SUFFIXES) and word not in _ENUM_SUFFIXES
+        }
         
         if not found_enums:
             return ""
         
         # Lookup actual values from project context
         enum_info = []
-        project_enums = self.context.project_context_cache.get('enums', {})
+        project_enums = self._get_project_enums()
         
-        for enum_name in found_enums:
+        for enum_name in sorted(found_enums):
             # Try exact match first
-            if enum_name in project_enums:
-                values = project_enums[enum_name].get('values', [])
+            info = project_enums.get(enum_name)
+            if info is not None:
+                values = info.get('values', [])
                 if values:
                     enum_info.append(f"- {enum_name}: {', '.join(values)}")
             else:
-                # Try partial match (enum might be stored without suffix)
-                for stored_name, info in project_enums.items():
-                    if enum_name in stored_name or stored_name in enum_name:
-                        values = info.get('values', [])
-                        if values:
-                            enum_info.append(f"- {enum_name}: {', '.join(values)}")
-                            break
+                # Try partial match (enum might be stored without suffix): first enum with values,
+                # in scan order, whose name contains enum_name or is contained in it
+                match = self._find_partial_enum(enum_name)
+                if match is not None:
+                    enum_info.append(f"- {enum_name}: {match}")
         
-        return '\n'.join(enum_info) if enum_info else ""
+        return '\n'.join(enum_info)
 
 
 if __name__ == "__main__":
@@ -2,11 +2,127 @@
 Test Validator - Compile, run, and auto-fix generated tests
 Implements the validation loop: generate -> compile -> run -> fix -> repeat
 """
+import hashlib
+import json
+import os
+import shutil
 import subprocess
 import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from dataclasses import asdict, dataclass
+from .context_gatherer import _prune_cache_dir, _scandir_java
+from .test_writer import clean_test_code
+
+# One fix candidate is sampled per temperature, all in parallel
+FIX_TEMPERATURES = (0.2, 0.6, 1.0)
+
+# Lines kept from the end of each Maven output stream; errors and summaries come last
+MAX_OUTPUT_LINES = 4096
+
+# Least recently used compile results beyond this are deleted at startup
+COMPILE_CACHE_MAX_FILES = 500
+
+# [ERROR] /path/to/File.java:[line,col] error: message
+_COMPILE_ERROR_RE = re.compile(r'\[ERROR\].*\.java:\[(\d+),\d+\]\s*(.*)')
+# /path/to/File.java:line: error: message (plain javac)
+_JAVAC_ERROR_RE = re.compile(r'\.java:(\d+):\s*error:\s*(.*)')
+
+# Common test failure causes as (pattern, error type), ordered by specificity
+_TEST_ERROR_SOURCES = (
+    # Mockito errors
+    (r'MockitoException.*Only void methods can doNothing', 'doNothing_on_non_void'),
+    (r'NotAMockException', 'NotAMockException'),
+    (r'PotentialStubbingProblem', 'PotentialStubbingProblem'),
+    (r'UnnecessaryStubbingException', 'UnnecessaryStubbingException'),
+    (r'InvalidUseOfMatchersException', 'InvalidMatchers'),
+    (r'WrongTypeOfReturnValue', 'WrongReturnType'),
+    (r'UnfinishedStubbingException', 'UnfinishedStubbing'),
+    
+    # Common runtime errors
+    (r'NullPointerException', 'NullPointerException'),
+    (r'NoSuchMethodError', 'NoSuchMethodError'),
+    (r'NoSuchFieldError', 'NoSuchFieldError'),
+    (r'ClassCastException', 'ClassCastException'),
+    (r'IllegalArgumentException', 'IllegalArgumentException'),
+    (r'IllegalStateException', 'IllegalStateException'),
+    
+    # Instancio errors
+    (r'InstancioApiException', 'InstancioError'),
+    (r'No candidates found for method call', 'InstancioMethodError'),
+    
+    # MapStruct errors
+    (r'Cannot instantiate.*interface', 'interface_instantiation'),
+    (r'Mappers\.getMapper.*returned null', 'MapperNotGenerated'),
+    
+    # Assertion errors
+    (r'AssertionFailedError.*expected.*but was', 'AssertionMismatch'),
+    (r'AssertionError', 'AssertionError'),
+    
+    # Compilation in test (shouldn't reach here but just in case)
+    (r'cannot find symbol', 'SymbolNotFound'),
+    (r'incompatible types', 'IncompatibleTypes'),
+)
+# (leading literal in lower case, pattern, error type). The literal is a cheap substring
+# probe on the lowercased output, so only patterns that can match are run.
+# Each match extends to the end of its line so it carries the error message.
+_TEST_ERROR_PATTERNS = [
+    (re.match(r'[\w ]+', pattern).group(0).lower(), re.compile(f'(?:{pattern})[^\\n]*', re.IGNORECASE), error_type)
+    for pattern, error_type in _TEST_ERROR_SOURCES
+]
+
+# Error types that can only come from one test library, with the pom.xml text that shows
+# the library is in use (spring-boot-starter-test brings in Mockito)
+_FRAMEWORK_ERROR_TYPES = (
+    (('mockito', 'spring-boot-starter-test'),
+     frozenset({'doNothing_on_non_void', 'NotAMockException', 'PotentialStubbingProblem',
+                'UnnecessaryStubbingException', 'InvalidMatchers', 'WrongReturnType', 'UnfinishedStubbing'})),
+    (('instancio',), frozenset({'InstancioError', 'InstancioMethodError'})),
+    (('mapstruct',), frozenset({'interface_instantiation', 'MapperNotGenerated'})),
+)
+
+# Output quoted in fix prompts; a recognized error type already names the cause,
+# so only the final summary is needed and the prompt stays small
+ERROR_OUTPUT_CHARS = 2000
+KNOWN_ERROR_OUTPUT_CHARS = 600
+# Output kept on a TestResult (and in the compile cache); at least ERROR_OUTPUT_CHARS
+RESULT_OUTPUT_CHARS = 8192
+_KNOWN_TEST_ERROR_TYPES = frozenset(error_type for _, error_type in _TEST_ERROR_SOURCES)
+
+_FAILURE_SUMMARY_RE = re.compile(r'Failures:\s*\n\s*\d+\)\s*(.*?)(?:\n\n|\Z)', re.DOTALL)
+_STACK_LINE_RE = re.compile(r'at.*Test\.(java|kt):(\d+)')
+
+# Maven build cache extension (needs Maven 3.9+); lets unchanged modules be restored
+# from cache so a validation build only recompiles the generated test
+BUILD_CACHE_EXTENSION_VERSION = "1.2.0"
+
+MAVEN_EXTENSIONS_XML = f"""<?xml version="1.0" encoding="UTF-8"?>
+<extensions xmlns="http://maven.apache.org/EXTENSIONS/1.1.0"
+            xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+            xsi:schemaLocation="http://maven.apache.org/EXTENSIONS/1.1.0 https://maven.apache.org/xsd/core-extensions-1.1.0.xsd">
+    <extension>
+        <groupId>org.apache.maven.extensions</groupId>
+        <artifactId>maven-build-cache-extension</artifactId>
+        <version>{BUILD_CACHE_EXTENSION_VERSION}</version>
+    </extension>
+</extensions>
+"""
+
+BUILD_CACHE_CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<cache xmlns="http://maven.apache.org/BUILD-CACHE-CONFIG/1.0.0"
+       xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+       xsi:schemaLocation="http://maven.apache.org/BUILD-CACHE-CONFIG/1.0.0 https://maven.apache.org/xsd/build-cache-config-1.0.0.xsd">
+    <configuration>
+        <enabled>true</enabled>
+        <hashAlgorithm>XX</hashAlgorithm>
+    </configuration>
+</cache>
+"""
 
 
 @dataclass
@@ -20,13 +136,152 @@ class TestResult:
     suggested_fix: Optional[str] = None
 
 
+def _output_tail(stdout: str, stderr: str = "") -> str:
+    """Last RESULT_OUTPUT_CHARS of stdout + stderr, without joining the full streams"""
+    if len(stderr) >= RESULT_OUTPUT_CHARS:
+        return stderr[-RESULT_OUTPUT_CHARS:]
+    return stdout[max(len(stdout) - (RESULT_OUTPUT_CHARS - len(stderr)), 0):] + stderr
+
+
+_PACKAGE_LINE_RE = re.compile(r'^package\s+[\w.]+\s*;[^\n]*\n?', re.MULTILINE)
+_IMPORT_LINE_RE = re.compile(r'^import\s', re.MULTILINE)
+_CLASS_DECL_RE = re.compile(r'^[ \t]*(?:public\s+)?(?:final\s+)?class\s+\w+', re.MULTILINE)
+_DO_NOTHING_RE = re.compile(r'doNothing\(\)\s*\.when\((\w+)\)\s*\.(\w+\(.*\))\s*;')
+_LENIENT_IMPORTS = (
+    "import org.mockito.junit.jupiter.MockitoSettings;",
+    "import org.mockito.quality.Strictness;",
+)
+_WHEN_IMPORT = "import static org.mockito.Mockito.when;"
+_MOCKITO_WILDCARD_IMPORT_RE = re.compile(r'^import\s+static\s+org\.mockito\.(?:Mockito|BDDMockito)\.\*\s*;', re.MULTILINE)
+# Return types thenReturn(null) cannot stand in for
+_PRIMITIVE_TYPES = frozenset({'boolean', 'byte', 'char', 'short', 'int', 'long', 'float', 'double', 'void'})
+_STATEMENT_KEYWORDS = frozenset({'return', 'throw', 'new', 'else', 'case', 'yield'})
+
+
+def _add_imports(code: str, imports: tuple) -> str:
+    """Add the import lines code does not have yet, ahead of its existing imports"""
+    missing = ''.join(f"{line}\n" for line in imports if line not in code)
+    # New imports go ahead of the existing ones, or right after the package line
+    anchor = _IMPORT_LINE_RE.search(code)
+    if anchor:
+        insert_at = anchor.start()
+    else:
+        package_match = _PACKAGE_LINE_RE.search(code)
+        insert_at = package_match.end() if package_match else 0
+    return code[:insert_at] + missing + code[insert_at:]
+
+
+def _make_stubs_lenient(test_code: str, error: TestResult, return_type_of) -> Optional[str]:
+    """Strict-stubbing failures go away with lenient Mockito strictness on the test class"""
+    class_match = _CLASS_DECL_RE.search(test_code)
+    if '@MockitoSettings' in test_code or not class_match:
+        return None  # Already configured, or nothing to annotate; leave it to the AI
+    
+    code = (test_code[:class_match.start()] + "@MockitoSettings(strictness = Strictness.LENIENT)\n"
+            + test_code[class_match.start():])
+    return _add_imports(code, _LENIENT_IMPORTS)
+
+
+def _stub_non_void_with_when(test_code: str, error: TestResult, return_type_of) -> Optional[str]:
+    """
+    Rewrite the doNothing() stub on the failing line into when(...).thenReturn(null)
+    Only done when the stubbed method is known to return a reference type;
+    return_type_of(mock type, method name) gives its declared return type or None
+    """
+    lines = test_code.split('\n')
+    index = (error.error_line or 0) - 1
+    if not 0 <= index < len(lines):
+        return None
+    match = _DO_NOTHING_RE.search(lines[index])
+    if not match:
+        return None
+    
+    mock_name, call = match.groups()
+    declaration = re.search(rf'(\w+)(?:<[^>\n]*>)?\s+{mock_name}\s*[;=]', test_code)
+    return_type = return_type_of(declaration.group(1), call[:call.index('(')]) if declaration else None
+    if return_type is None or return_type in _PRIMITIVE_TYPES:
+        return None  # null would not compile or would fail unboxing; leave it to the AI
+    
+    lines[index] = lines[index][:match.start()] + f"when({mock_name}.{call}).thenReturn(null);" + lines[index][match.end():]
+    code = '\n'.join(lines)
+    if _MOCKITO_WILDCARD_IMPORT_RE.search(code):
+        return code
+    return _add_imports(code, (_WHEN_IMPORT,))
+
+
+# Deterministic fixes for well-understood failures, tried before asking the AI.
+# Each returns the fixed code, or None when it does not apply.
+_STATIC_FIXERS = {
+    'UnnecessaryStubbingException': _make_stubs_lenient,
+    'PotentialStubbingProblem': _make_stubs_lenient,
+    'doNothing_on_non_void': _stub_non_void_with_when,
+}
+
+
 class TestValidator:
     """Validate generated tests by compiling and running them"""
     
-    def __init__(self, project_root: str, ai_client=None):
+    def __init__(self, project_root: str, ai_client=None, use_build_cache: bool = False,
+                 use_offline: bool = True):
         self.project_root = Path(project_root)
         self.ai_client = ai_client
         self.max_fix_attempts = 3
+        # The Maven daemon keeps a warm JVM with plugins loaded between validation builds
+        self.mvn_cmd = "mvnd" if shutil.which("mvnd") else "mvn"
+        # Opt-in: the extension is registered in the project's .mvn/, which all its builds read
+        self.use_build_cache = use_build_cache
+        self._build_cache_ready = False  # .mvn/ files checked, done before the first build
+        # Compile results by hash of test code and main sources; also kept on disk across runs
+        self._compile_cache = {}
+        # Validation builds run offline (-o) once dependencies are cached; decided on first build
+        self.use_offline = use_offline
+        self._offline = None
+        self._test_error_patterns = self._project_error_patterns()
+        self.compile_cache_dir = self.project_root / ".test-generator-cache" / "compile"
+        self._main_class_index = None  # Main class name -> source path, for _declared_return_type
+        _prune_cache_dir(self.compile_cache_dir, COMPILE_CACHE_MAX_FILES, '.json')
+    
+    def _project_error_patterns(self) -> list:
+        """_TEST_ERROR_PATTERNS without the ones for test libraries this project does not use"""
+        try:
+            pom = (self.project_root / "pom.xml").read_text(encoding='utf-8').lower()
+        except (OSError, UnicodeDecodeError):
+            return _TEST_ERROR_PATTERNS
+        if '<modules>' in pom:
+            return _TEST_ERROR_PATTERNS  # Dependencies may be declared in module poms
+        
+        unused = set()
+        for markers, error_types in _FRAMEWORK_ERROR_TYPES:
+            if not any(marker in pom for marker in markers):
+                unused |= error_types
+        return [entry for entry in _TEST_ERROR_PATTERNS if entry[2] not in unused]
+    
+    def _ensure_build_cache_config(self):
+        """Register the Maven build cache extension in .mvn/ unless the project already has its own files"""
+        if self._build_cache_ready:
+            return
+        self._build_cache_ready = True
+        mvn_dir = self.project_root / ".mvn"
+        try:
+            for name, content in (("extensions.xml", MAVEN_EXTENSIONS_XML),
+                                  ("maven-build-cache-config.xml", BUILD_CACHE_CONFIG_XML)):
+                path = mvn_dir / name
+                if not path.exists():
+                    mvn_dir.mkdir(exist_ok=True)
+                    path.write_text(content, encoding='utf-8')
+        except OSError as e:
+            print(f"⚠️  Could not set up Maven build cache: {e}")
+    
+    def _maven_command(self, goal: str, *test_class_names: str, parallel: bool = False) -> list:
+        """Maven command line for building or running generated tests"""
+        command = [self.mvn_cmd, goal, "-q"]
+        if parallel:
+            command += ["-T", "1C"]  # One build thread per CPU core
+        if self.use_build_cache:
+            self._ensure_build_cache_config()
+            command.append("-Dmaven.build.cache.enabled=true")
+        command.append("-Dtest=" + ",".join(f"{name}Test" for name in test_class_names))
+        return command
     
     def validate_and_fix(self, test_code: str, test_class_name: str, test_package: str) -> Tuple[str, bool]:
         """
@@ -34,34 +289,44 @@ class TestValidator:
         Returns: (fixed_test_code, success)
         """
         current_code = test_code
+        precompiled = False  # True when a fix candidate was already compiled on disk
         
         for attempt in range(self.max_fix_attempts):
             print(f"🔄 Validation attempt {attempt + 1}/{self.max_fix_attempts}")
             
-            # Step 1: Write test file
-            test_path = self._write_test_file(current_code, test_class_name, test_package)
-            if not test_path:
-                print("❌ Failed to write test file")
-                return current_code, False
-            
-            # Step 2: Compile
-            compile_result = self._compile_test(test_class_name)
-            if not compile_result.success:
-                print(f"❌ Compilation failed: {compile_result.error_message}")
-                if self.ai_client and attempt < self.max_fix_attempts - 1:
-                    current_code = self._fix_with_ai(current_code, compile_result, "compile")
-                    continue
-                return current_code, False
-            
-            print("✅ Compilation successful")
+            if not precompiled:
+                # Step 1: Write test file
+                test_path = self._write_test_file(current_code, test_class_name, test_package)
+                if not test_path:
+                    print("❌ Failed to write test file")
+                    return current_code, False
+                
+                # Step 2: Compile
+                compile_result = self._compile_test_cached(current_code, test_class_name, test_package)
+                if not compile_result.success:
+                    print(f"❌ Compilation failed: {compile_result.error_message}")
+                    if self.ai_client and attempt < self.max_fix_attempts - 1:
+                        current_code, precompiled = self._fix_compile_error(
+                            current_code, compile_result, test_class_name, test_package
+                        )
+                        continue
+                    return current_code, False
+                
+                print("✅ Compilation successful")
+            precompiled = False
             
             # Step 3: Run test
             run_result = self._run_test(test_class_name)
             if not run_result.success:
                 print(f"❌ Test failed: {run_result.error_message}")
-                if self.ai_client and attempt < self.max_fix_attempts - 1:
-                    current_code = self._fix_with_ai(current_code, run_result, "runtime")
-                    continue
+                if attempt < self.max_fix_attempts - 1:
+                    fixed_code = self._apply_static_fix(current_code, run_result)
+                    if fixed_code is not None:
+                        current_code = fixed_code
+                        continue
+                    if self.ai_client:
+                        current_code = self._fix_with_ai(current_code, run_result, "runtime")
+                        continue
                 return current_code, False
             
             print("✅ Test passed!")
@@ -69,10 +334,61 @@ class TestValidator:
         
         return current_code, False
     
+    def validate_and_fix_many(self, tests: List[Tuple[str, str, str]]) -> List[Tuple[str, bool]]:
+        """
+        Validate several independent tests, given as (test_code, test_class_name, test_package)
+        All tests are compiled and run in one Maven build; only the ones that fail go through
+        the per-test fix loop. Maven builds share the target directory, so builds never overlap.
+        Returns: [(fixed_test_code, success), ...] in the order of tests
+        """
+        if not tests:
+            return []
+        
+        print(f"🔄 Validating {len(tests)} tests in one build")
+        for test_code, test_class_name, test_package in tests:
+            if not self._write_test_file(test_code, test_class_name, test_package):
+                print(f"❌ Failed to write test file for {test_class_name}")
+        
+        class_names = [test_class_name for _, test_class_name, _ in tests]
+        passed = set()
+        if self._compile_test(*class_names, parallel=True).success:
+            print("✅ Compilation successful")
+            started = time.time()
+            if self._run_test(*class_names).success:
+                passed.update(class_names)
+            else:
+                passed.update(self._passed_test_classes(tests, started))
+        
+        results = []
+        for test_code, test_class_name, test_package in tests:
+            if test_class_name in passed:
+                print(f"✅ {test_class_name}Test passed!")
+                results.append((test_code, True))
+            else:
+                print(f"\n🔬 Validating {test_class_name}Test on its own")
+                results.append(self.validate_and_fix(test_code, test_class_name, test_package))
+        return results
+    
+    def _passed_test_classes(self, tests: List[Tuple[str, str, str]], since: float) -> set:
+        """Names of the classes whose Surefire report, written after since, shows no failures"""
+        reports_dir = self.project_root / "target" / "surefire-reports"
+        passed = set()
+        for _, test_class_name, test_package in tests:
+            report = reports_dir / f"TEST-{test_package}.{test_class_name}Test.xml"
+            try:
+                if report.stat().st_mtime < since:
+                    continue  # Left over from an earlier build
+                suite = ET.parse(report).getroot()
+            except (OSError, ET.ParseError):
+                continue
+            if suite.get('failures', '0') == '0' and suite.get('errors', '0') == '0':
+                passed.add(test_class_name)
+        return passed
+    
     def _write_test_file(self, test_code: str, class_name: str, package: str) -> Optional[Path]:
         """Write test code to appropriate location"""
         # Clean up markdown if present
-        test_code = self._clean_test_code(test_code)
+        test_code = clean_test_code(test_code)
         
         # Build path
         package_path = package.replace('.', '/')
@@ -80,37 +396,172 @@ class TestValidator:
         test_dir.mkdir(parents=True, exist_ok=True)
         
         test_file = test_dir / f"{class_name}Test.java"
-        test_file.write_text(test_code, encoding='utf-8')
+        content = test_code.encode('utf-8')
+        # Leave identical files untouched so their mtime does not trigger a Maven recompile
+        try:
+            if test_file.read_bytes() == content:
+                return test_file
+        except OSError:
+            pass
         
+        tmp_file = test_file.with_suffix('.tmp')
+        tmp_file.write_bytes(content)
+        os.replace(tmp_file, test_file)
         return test_file
     
-    def _clean_test_code(self, code: str) -> str:
-        """Remove markdown code blocks if present"""
-        # Remove ```java and ``` markers
-        code = re.sub(r'^```java\s*\n?', '', code.strip())
-        code = re.sub(r'^```\s*\n?', '', code.strip())
-        code = re.sub(r'\n?```\s*$', '', code.strip())
-        return code.strip()
+    def _compile_test_cached(self, test_code: str, test_class_name: str, test_package: str) -> TestResult:
+        """Compile a test already written to disk, reusing the result for identical code and sources"""
+        digest = hashlib.blake2b(digest_size=16)
+        test_file = self.project_root / "src" / "test" / "java" / test_package.replace('.', '/') / f"{test_class_name}Test.java"
+        for part in (test_package, test_class_name, clean_test_code(test_code), self._sources_fingerprint(test_file)):
+            digest.update(part.encode('utf-8') + b'\0')
+        key = digest.hexdigest()
+        
+        result = self._compile_cache.get(key)
+        if result is None:
+            result = self._load_compile_result(key)
+        if result is not None:
+            print("♻️  Same code compiled before, reusing the result")
+            self._compile_cache[key] = result
+            return result
+        
+        result = self._compile_test(test_class_name)
+        # Timeouts and tool failures say nothing about the code, so only real outcomes are kept
+        if result.error_type in (None, "compilation"):
+            self._compile_cache[key] = result
+            self._save_compile_result(key, result)
+        return result
+    
+    def _sources_fingerprint(self, test_file: Path) -> str:
+        """
+        Hash of the pom and the path, size and mtime of every main and test source and resource
+        test-compile builds all of src/test, so another broken test fails this one too;
+        test_file itself is left out because its code is hashed separately
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            stat = (self.project_root / "pom.xml").stat()
+            digest.update(f"pom.xml:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+        except OSError:
+            pass
+        skip = str(test_file)
+        for source_dir in ("main", "test"):
+            for root, dirs, files in os.walk(self.project_root / "src" / source_dir):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    if path == skip:
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
     
-    def _compile_test(self, test_class_name: str) -> TestResult:
-        """Compile the test using Maven"""
+    def _load_compile_result(self, key: str) -> Optional[TestResult]:
+        """Read a compile result saved by an earlier run, or None"""
+        path = self.compile_cache_dir / f"{key}.json"
         try:
-            result = subprocess.run(
-                ["mvn", "test-compile", "-q", f"-Dtest={test_class_name}Test"],
-                cwd=str(self.project_root),
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
+            with open(path, 'r', encoding='utf-8') as f:
+                result = TestResult(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for _prune_cache_dir
+        except OSError:
+            pass
+        return result
+    
+    def _save_compile_result(self, key: str, result: TestResult):
+        """Atomically write a compile result; the cache is best effort"""
+        try:
+            self.compile_cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.compile_cache_dir / f"{key}.json"
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(result), f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    
+    def _run_maven(self, command: list, timeout: float) -> subprocess.CompletedProcess:
+        """Run a Maven command, offline once the project's dependencies are cached locally"""
+        if not self._dependencies_offline():
+            return self._run_build(command, timeout)
+        
+        result = self._run_build(command[:1] + ["-o"] + command[1:], timeout)
+        if result.returncode != 0 and "offline mode" in result.stdout + result.stderr:
+            # go-offline misses artifacts some plugins only resolve while running; stay online from now on
+            self._offline = False
+            result = self._run_build(command, timeout)
+        return result
+    
+    def _dependencies_offline(self) -> bool:
+        """Whether validation builds can skip remote dependency resolution"""
+        if self._offline is None:
+            self._offline = self.use_offline and self._prepare_offline()
+        return self._offline
+    
+    def _prepare_offline(self) -> bool:
+        """Download all project dependencies once per pom.xml change so Maven can run with -o"""
+        marker = self.project_root / ".test-generator-cache" / "offline-ready"
+        try:
+            pom_mtime = (self.project_root / "pom.xml").stat().st_mtime_ns
+            if marker.exists() and marker.stat().st_mtime_ns >= pom_mtime:
+                return True
+            
+            print("📦 Downloading Maven dependencies for offline validation builds...")
+            if self._run_build([self.mvn_cmd, "dependency:go-offline", "-q"], timeout=900).returncode != 0:
+                return False
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+            return True
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+    
+    def _run_build(self, command: list, timeout: float) -> subprocess.CompletedProcess:
+        """
+        Run a build command (mvn, javac) in the project root, keeping only the last
+        MAX_OUTPUT_LINES lines of each stream
+        Raises subprocess.TimeoutExpired (after killing the process) like subprocess.run
+        """
+        process = subprocess.Popen(command, cwd=str(self.project_root),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        tails = (deque(maxlen=MAX_OUTPUT_LINES), deque(maxlen=MAX_OUTPUT_LINES))
+        readers = [threading.Thread(target=tail.extend, args=(stream,), daemon=True)
+                   for tail, stream in zip(tails, (process.stdout, process.stderr))]
+        for reader in readers:
+            reader.start()
+        
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            for reader in readers:
+                reader.join()
+            process.stdout.close()
+            process.stderr.close()
+        
+        return subprocess.CompletedProcess(command, returncode, ''.join(tails[0]), ''.join(tails[1]))
+    
+    def _compile_test(self, *test_class_names: str, parallel: bool = False) -> TestResult:
+        """Compile the tests using Maven"""
+        try:
+            command = self._maven_command("test-compile", *test_class_names, parallel=parallel)
+            result = self._run_maven(command, timeout=120)
             
             if result.returncode == 0:
-                return TestResult(success=True, output=result.stdout)
+                return TestResult(success=True, output=_output_tail(result.stdout))
             
             # Parse compilation error
             error_info = self._parse_compile_error(result.stderr + result.stdout)
             return TestResult(
                 success=False,
-                output=result.stdout + result.stderr,
+                output=_output_tail(result.stdout, result.stderr),
                 error_type="compilation",
                 error_message=error_info.get('message', 'Unknown compilation error'),
                 error_line=error_info.get('line')
@@ -120,25 +571,20 @@ class TestValidator:
         except Exception as e:
             return TestResult(success=False, output="", error_type="exception", error_message=str(e))
     
-    def _run_test(self, test_class_name: str) -> TestResult:
-        """Run the test using Maven"""
+    def _run_test(self, *test_class_names: str) -> TestResult:
+        """Run the tests using Maven"""
         try:
-            result = subprocess.run(
-                ["mvn", "test", "-q", f"-Dtest={test_class_name}Test"],
-                cwd=str(self.project_root),
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+            command = self._maven_command("test", *test_class_names)
+            result = self._run_maven(command, timeout=300 * len(test_class_names))
             
             if result.returncode == 0:
-                return TestResult(success=True, output=result.stdout)
+                return TestResult(success=True, output=_output_tail(result.stdout))
             
             # Parse test failure
             error_info = self._parse_test_error(result.stderr + result.stdout)
             return TestResult(
                 success=False,
-                output=result.stdout + result.stderr,
+                output=_output_tail(result.stdout, result.stderr),
                 error_type=error_info.get('type', 'test_failure'),
                 error_message=error_info.get('message', 'Test failed'),
                 error_line=error_info.get('line')
@@ -149,12 +595,11 @@ class TestValidator:
             return TestResult(success=False, output="", error_type="exception", error_message=str(e))
     
     def _parse_compile_error(self, output: str) -> dict:
-        """Parse Maven compilation error output"""
+        """Parse Maven (or plain javac) compilation error output"""
         info = {}
         
         # Look for error line pattern: [ERROR] /path/to/File.java:[line,col] error: message
-        error_pattern = r'\[ERROR\].*\.java:\[(\d+),\d+\]\s*(.*)'
-        match = re.search(error_pattern, output)
+        match = _COMPILE_ERROR_RE.search(output) or _JAVAC_ERROR_RE.search(output)
         if match:
             info['line'] = int(match.group(1))
             info['message'] = match.group(2)
@@ -173,80 +618,42 @@ class TestValidator:
         info = {'type': 'test_failure'}
         
         # Look for common error patterns (ordered by specificity)
-        error_patterns = [
-            # Mockito errors
-            (r'MockitoException.*Only void methods can doNothing', 'doNothing_on_non_void'),
-            (r'NotAMockException', 'NotAMockException'),
-            (r'PotentialStubbingProblem', 'PotentialStubbingProblem'),
-            (r'UnnecessaryStubbingException', 'UnnecessaryStubbingException'),
-            (r'InvalidUseOfMatchersException', 'InvalidMatchers'),
-            (r'WrongTypeOfReturnValue', 'WrongReturnType'),
-            (r'UnfinishedStubbingException', 'UnfinishedStubbing'),
-            
-            # Common runtime errors
-            (r'NullPointerException', 'NullPointerException'),
-            (r'NoSuchMethodError', 'NoSuchMethodError'),
-            (r'NoSuchFieldError', 'NoSuchFieldError'),
-            (r'ClassCastException', 'ClassCastException'),
-            (r'IllegalArgumentException', 'IllegalArgumentException'),
-            (r'IllegalStateException', 'IllegalStateException'),
-            
-            # Instancio errors
-            (r'InstancioApiException', 'InstancioError'),
-            (r'No candidates found for method call', 'InstancioMethodError'),
-            
-            # MapStruct errors
-            (r'Cannot instantiate.*interface', 'interface_instantiation'),
-            (r'Mappers\.getMapper.*returned null', 'MapperNotGenerated'),
-            
-            # Assertion errors
-            (r'AssertionFailedError.*expected.*but was', 'AssertionMismatch'),
-            (r'AssertionError', 'AssertionError'),
-            
-            # Compilation in test (shouldn't reach here but just in case)
-            (r'cannot find symbol', 'SymbolNotFound'),
-            (r'incompatible types', 'IncompatibleTypes'),
-        ]
-        
-        for pattern, error_type in error_patterns:
-            if re.search(pattern, output, re.IGNORECASE):
+        lowered = output.lower()
+        for literal, pattern, error_type in self._test_error_patterns:
+            match = pattern.search(output) if literal in lowered else None
+            if match:
                 info['type'] = error_type
-                # Extract context around the error
-                match = re.search(f'({pattern}[^\\n]*)', output, re.IGNORECASE)
-                if match:
-                    info['message'] = match.group(1)[:500]  # Limit message length
+                # Keep the rest of the line as context
+                info['message'] = match.group(0)[:500]  # Limit message length
                 break
         
         # If no pattern matched, try to get any error message
         if 'message' not in info:
             # Look for failure summary
-            failure_match = re.search(r'Failures:\s*\n\s*\d+\)\s*(.*?)(?:\n\n|\Z)', output, re.DOTALL)
+            failure_match = _FAILURE_SUMMARY_RE.search(output)
             if failure_match:
                 info['message'] = failure_match.group(1)[:500].strip()
             else:
                 info['message'] = 'Test failed - check output for details'
         
         # Extract stack trace line number
-        line_pattern = r'at.*Test\.(java|kt):(\d+)'
-        line_match = re.search(line_pattern, output)
+        line_match = _STACK_LINE_RE.search(output)
         if line_match:
             info['line'] = int(line_match.group(2))
         
         return info
     
-    def _fix_with_ai(self, test_code: str, error: TestResult, error_phase: str) -> str:
-        """Use AI to fix the test based on the error"""
-        if not self.ai_client:
-            return test_code
-        
-        fix_prompt = f"""The following test has a {error_phase} error. Please fix it.
+    def _build_fix_prompt(self, test_code: str, error: TestResult, error_phase: str) -> str:
+        """Build the prompt asking the AI to fix a failing test"""
+        output_chars = KNOWN_ERROR_OUTPUT_CHARS if error.error_type in _KNOWN_TEST_ERROR_TYPES else ERROR_OUTPUT_CHARS
+        return f"""The following test has a {error_phase} error. Please fix it.
 
 ## ERROR TYPE: {error.error_type}
 ## ERROR MESSAGE: {error.error_message}
 ## ERROR LINE: {error.error_line if error.error_line else 'Unknown'}
 
-## FULL ERROR OUTPUT (last 2000 chars):
-{error.output[-2000:]}
+## FULL ERROR OUTPUT (last {output_chars} chars):
+{error.output[-output_chars:]}
 
 ## CURRENT TEST CODE:
 ```java
@@ -268,22 +675,161 @@ Common fixes:
 
 Return the fixed test code:
 """
+    
+    def _apply_static_fix(self, test_code: str, error: TestResult) -> Optional[str]:
+        """Fix a known failure locally; returns None when the AI is needed"""
+        fixer = _STATIC_FIXERS.get(error.error_type)
+        if fixer is None:
+            return None
+        # Line numbers in the error refer to the file on disk, i.e. the cleaned code
+        fixed_code = fixer(clean_test_code(test_code), error, self._declared_return_type)
+        if fixed_code is not None:
+            print(f"🔧 Applied known fix for {error.error_type}")
+        return fixed_code
+    
+    def _declared_return_type(self, class_name: str, method_name: str) -> Optional[str]:
+        """
+        Return type of a method declared in a main source class, or None if the class is not
+        found or its overloads disagree
+        """
+        if self._main_class_index is None:
+            self._main_class_index = {}
+            for entry in _scandir_java(str(self.project_root / "src" / "main" / "java")):
+                self._main_class_index.setdefault(entry.name[:-5], entry.path)
+        path = self._main_class_index.get(class_name)
+        if not path:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                source = f.read()
+        except OSError:
+            return None
+        
+        declaration_re = re.compile(
+            rf'([\w.]+(?:<[^;{{}}()]*>)?(?:\[\])*)\s+{re.escape(method_name)}\s*\([^)]*\)\s*(?:throws\s+[\w.,\s]+)?[;{{]'
+        )
+        # 'return find(x);' has the same shape as a declaration
+        return_types = {match.group(1) for match in declaration_re.finditer(source)} - _STATEMENT_KEYWORDS
+        return return_types.pop() if len(return_types) == 1 else None
+    
+    def _fix_with_ai(self, test_code: str, error: TestResult, error_phase: str) -> str:
+        """Use AI to fix the test based on the error"""
+        if not self.ai_client:
+            return test_code
+        
+        fix_prompt = self._build_fix_prompt(test_code, error, error_phase)
         
         try:
             response = self.ai_client.send_message(fix_prompt)
-            fixed_code = self._clean_test_code(response)
+            fixed_code = clean_test_code(response)
             return fixed_code
         except Exception as e:
             print(f"AI fix failed: {e}")
             return test_code
     
+    def _fix_compile_error(self, test_code: str, error: TestResult, test_class_name: str,
+                           test_package: str) -> Tuple[str, bool]:
+        """
+        Sample several fixes in parallel and keep the first one that compiles
+        Returns: (fixed_test_code, compiled) - compiled means the returned code is already on disk and compiles
+        """
+        fix_prompt = self._build_fix_prompt(test_code, error, "compile")
+        executor = ThreadPoolExecutor(max_workers=len(FIX_TEMPERATURES))
+        futures = [executor.submit(self.ai_client.generate_once, fix_prompt, temperature)
+                   for temperature in FIX_TEMPERATURES]
+        
+        first_candidate = None
+        try:
+            # Maven builds share the target directory, so candidates are compiled one at a time
+            # in the order they arrive while slower samples are still generating
+            for index, future in enumerate(as_completed(futures), 1):
+                try:
+                    response = future.result()
+                except Exception as e:
+                    print(f"AI fix failed: {e}")
+                    continue
+                if response.startswith("Error from AI:"):
+                    print(f"AI fix failed: {response}")
+                    continue
+                
+                candidate = clean_test_code(response)
+                first_candidate = first_candidate or candidate
+                print(f"🔧 Compiling fix candidate {index}/{len(futures)}")
+                if not self._write_test_file(candidate, test_class_name, test_package):
+                    continue
+                if self._compile_test_cached(candidate, test_class_name, test_package).success:
+                    print("✅ Compilation successful")
+                    return candidate, True
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if first_candidate is None:
+            # No sample came back; fall back to a fix within the chat session
+            return self._fix_with_ai(test_code, error, "compile"), False
+        return first_candidate, False
+    
     def quick_compile_check(self, test_code: str, test_class_name: str, test_package: str) -> TestResult:
         """Quick check if test compiles without running it"""
         test_path = self._write_test_file(test_code, test_class_name, test_package)
         if not test_path:
             return TestResult(success=False, output="", error_message="Failed to write file")
         
-        return self._compile_test(test_class_name)
+        # Compiling the one file with javac skips the whole Maven lifecycle
+        classpath = self._test_classpath()
+        if classpath is not None:
+            return self._javac_compile(test_path, classpath)
+        return self._compile_test_cached(test_code, test_class_name, test_package)
+    
+    def _test_classpath(self) -> Optional[str]:
+        """
+        Classpath for compiling a single test with javac, or None to fall back to Maven
+        Dependencies come from mvn dependency:build-classpath, cached until pom.xml changes
+        """
+        classes_dir = self.project_root / "target" / "classes"
+        if not shutil.which("javac") or not classes_dir.is_dir():
+            return None  # No JDK compiler on PATH, or main classes not built yet
+        
+        classpath_file = self.project_root / ".test-generator-cache" / "classpath.txt"
+        try:
+            pom_mtime = (self.project_root / "pom.xml").stat().st_mtime_ns
+            stale = not classpath_file.exists() or classpath_file.stat().st_mtime_ns < pom_mtime
+            if stale:
+                classpath_file.parent.mkdir(parents=True, exist_ok=True)
+                command = [self.mvn_cmd, "dependency:build-classpath", "-q", f"-Dmdep.outputFile={classpath_file}"]
+                if self._run_build(command, timeout=120).returncode != 0:
+                    return None
+            dependencies = classpath_file.read_text(encoding='utf-8').strip()
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        
+        test_classes_dir = self.project_root / "target" / "test-classes"
+        return os.pathsep.join(path for path in (str(classes_dir), str(test_classes_dir), dependencies) if path)
+    
+    def _javac_compile(self, test_path: Path, classpath: str) -> TestResult:
+        """Compile one test file into target/test-classes with javac"""
+        test_classes_dir = self.project_root / "target" / "test-classes"
+        try:
+            test_classes_dir.mkdir(parents=True, exist_ok=True)
+            result = self._run_build(
+                ["javac", "-encoding", "UTF-8", "-cp", classpath, "-d", str(test_classes_dir), str(test_path)],
+                timeout=120
+            )
+        except subprocess.TimeoutExpired:
+            return TestResult(success=False, output="", error_type="timeout", error_message="Compilation timed out")
+        except Exception as e:
+            return TestResult(success=False, output="", error_type="exception", error_message=str(e))
+        
+        if result.returncode == 0:
+            return TestResult(success=True, output=_output_tail(result.stdout))
+        
+        error_info = self._parse_compile_error(result.stderr + result.stdout)
+        return TestResult(
+            success=False,
+            output=_output_tail(result.stdout, result.stderr),
+            error_type="compilation",
+            error_message=error_info.get('message', 'Unknown compilation error'),
+            error_line=error_info.get('line')
+        )
 
 
 if __name__ == "__main__":
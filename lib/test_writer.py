@@ -2,8 +2,22 @@
 Test Writer - Save generated tests to files
 """
 import os
+import re
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional, Set, Tuple
+
+# Markdown fences the AI sometimes wraps code in
+_FENCE_JAVA_RE = re.compile(r'^```java\s*\n?')
+_FENCE_OPEN_RE = re.compile(r'^```\s*\n?')
+_FENCE_CLOSE_RE = re.compile(r'\n?```\s*$')
+
+
+def clean_test_code(code: str) -> str:
+    """Remove the markdown code fence around an AI response, if present"""
+    code = _FENCE_JAVA_RE.sub('', code.strip())
+    code = _FENCE_OPEN_RE.sub('', code.strip())
+    code = _FENCE_CLOSE_RE.sub('', code.strip())
+    return code.strip()
 
 
 class TestWriter:
@@ -12,49 +26,32 @@ class TestWriter:
     def __init__(self, project_root: str, test_dir: str = "src/test/java"):
         self.project_root = Path(project_root)
         self.test_dir = self.project_root / test_dir
+        self._test_dir_str = str(self.test_dir)  # For building paths with plain string joins
     
     def write_test(self, package: str, class_name: str, content: str, 
                    is_integration: bool = False) -> str:
         """Write test content to file"""
-        # Determine test class name
-        if is_integration:
-            test_class_name = class_name.replace("Impl", "") + "IntegrationTest"
-        else:
-            test_class_name = class_name + "Test"
-        
-        # Create directory path from package
-        package_path = package.replace(".", os.sep)
-        dir_path = self.test_dir / package_path
-        dir_path.mkdir(parents=True, exist_ok=True)
-        
-        # Write file
-        file_path = dir_path / f"{test_class_name}.java"
-        
-        # Clean the content (remove markdown code blocks if present)
-        clean_content = self._clean_code(content)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(clean_content)
-        
-        return str(file_path)
+        return self.write_many([(package, class_name, content, is_integration)])[0]
     
-    def _clean_code(self, content: str) -> str:
-        """Remove markdown code blocks and clean up the content"""
-        # Remove ```java and ``` markers
-        lines = content.split('\n')
-        clean_lines = []
-        in_code_block = False
-        
-        for line in lines:
-            if line.strip().startswith('```java'):
-                in_code_block = True
-                continue
-            elif line.strip() == '```':
-                in_code_block = False
-                continue
-            clean_lines.append(line)
-        
-        return '\n'.join(clean_lines)
+    def write_many(self, tests: Iterable[Tuple[str, str, str, bool]]) -> List[str]:
+        """
+        Write several (package, class_name, content, is_integration) tests, creating each directory once
+        Returns: the written file paths, in order
+        """
+        created_dirs = set()
+        file_paths = []
+        for package, class_name, content, is_integration in tests:
+            file_path = self.get_test_path(package, class_name, is_integration)
+            dir_path = os.path.dirname(file_path)
+            if dir_path not in created_dirs:
+                os.makedirs(dir_path, exist_ok=True)
+                created_dirs.add(dir_path)
+            
+            # Clean the content the same way the validator does, so the saved file matches what was compiled
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(clean_test_code(content))
+            file_paths.append(file_path)
+        return file_paths
     
     def get_test_path(self, package: str, class_name: str, 
                       is_integration: bool = False) -> str:
@@ -64,14 +61,24 @@ class TestWriter:
         else:
             test_class_name = class_name + "Test"
         
-        package_path = package.replace(".", os.sep)
-        return str(self.test_dir / package_path / f"{test_class_name}.java")
+        return os.path.join(self._test_dir_str, package.replace(".", os.sep), f"{test_class_name}.java")
     
     def test_exists(self, package: str, class_name: str, 
                     is_integration: bool = False) -> bool:
         """Check if a test file already exists"""
-        path = self.get_test_path(package, class_name, is_integration)
-        return Path(path).exists()
+        return os.path.exists(self.get_test_path(package, class_name, is_integration))
+    
+    def existing_tests(self, tests: Iterable[Tuple[str, str, bool]]) -> Set[Tuple[str, str, bool]]:
+        """
+        Check many (package, class_name, is_integration) tests with one scan of the test directory
+        Returns: the subset of tests whose file already exists
+        """
+        test_files = {
+            os.path.join(root, name)
+            for root, _, files in os.walk(self._test_dir_str)
+            for name in files if name.endswith("Test.java")
+        }
+        return {test for test in tests if self.get_test_path(*test) in test_files}
 
 
 if __name__ == "__main__":